@@ -0,0 +1,43 @@
+import logging
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.categorize.model import Categorizer
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_categorizer: Optional["Categorizer"] = None
+
+
+def get_categorizer() -> "Categorizer":
+    """Return the process-wide categorizer, loading (or first training) it once.
+
+    NumPy is only imported here, so processes that never categorize a note
+    do not pay for it at startup.
+    """
+    global _categorizer
+    if _categorizer is not None:
+        return _categorizer
+
+    with _lock:
+        if _categorizer is None:
+            from app.categorize.model import Categorizer, load_corpus
+
+            settings = get_settings()
+            directory = settings.categorizer_model_dir
+            if not Categorizer.exists(directory):
+                logger.info("Training the categorizer from the seed corpus", extra={"path": directory})
+                Categorizer.train(load_corpus()).save(directory)
+            _categorizer = Categorizer.load(directory, min_confidence=settings.categorizer_min_confidence)
+    return _categorizer
+
+
+def reset_categorizer() -> None:
+    """Forget the loaded model, e.g. after retraining it in place."""
+    global _categorizer
+    with _lock:
+        _categorizer = None
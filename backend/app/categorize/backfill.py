@@ -0,0 +1,70 @@
+"""Categorize existing notes that have no subject yet.
+
+Usage (from the backend directory):
+
+    python -m app.categorize.backfill [--chunk-size 1000] [--overwrite]
+
+Notes are read in id order, classified a chunk at a time and updated in
+one bulk statement per chunk. --overwrite recategorizes every completed
+note, replacing subjects and topics that were set by hand.
+"""
+import argparse
+import time
+
+from sqlalchemy import select, update
+
+from app.categorize import get_categorizer
+from app.database import SessionLocal, create_tables
+from app.models.note import Note, ProcessingStatus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill note subjects and topics.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="notes classified and committed per batch")
+    parser.add_argument("--overwrite", action="store_true", help="also replace existing subjects and topics")
+    args = parser.parse_args()
+
+    create_tables()
+    categorizer = get_categorizer()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        seen = categorized = 0
+        last_id = 0
+        while True:
+            query = select(Note.id, Note.raw_text, Note.topic).where(
+                Note.id > last_id,
+                Note.status == ProcessingStatus.COMPLETED,
+            )
+            if not args.overwrite:
+                query = query.where(Note.subject.is_(None))
+            rows = db.execute(query.order_by(Note.id).limit(args.chunk_size)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            seen += len(rows)
+
+            categories = categorizer.categorize_batch([row.raw_text or "" for row in rows])
+            changes = [
+                {
+                    "id": row.id,
+                    "subject": category.subject,
+                    # a topic typed by hand survives unless overwriting
+                    "topic": category.topic if args.overwrite or row.topic is None else row.topic,
+                }
+                for row, category in zip(rows, categories)
+                if category is not None
+            ]
+            if changes:
+                db.execute(update(Note), changes)
+                db.commit()
+            categorized += len(changes)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    print(f"Categorized {categorized} of {seen} notes in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import json
+import os
+import tempfile
+import zlib
+from collections import Counter
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.search.base import tokenize
+
+MODEL_VERSION = 1
+DEFAULT_FEATURES = 2 ** 16
+
+SEED_CORPUS = os.path.join(os.path.dirname(__file__), "seed_corpus.tsv")
+
+# a batch of documents as CSR arrays: row offsets, feature columns and tf-idf values
+SparseRows = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class Category(NamedTuple):
+    subject: str
+    topic: Optional[str]
+    subject_confidence: float
+    topic_confidence: float
+
+
+def load_corpus(path: str = SEED_CORPUS) -> List[Tuple[str, str, str]]:
+    """(subject, topic, text) rows of a tab-separated corpus; # starts a comment line."""
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            subject, topic, text = line.rstrip("\n").split("\t", 2)
+            rows.append((subject, topic, text))
+    return rows
+
+
+# function words that say nothing about a note's subject
+STOP_WORDS = frozenset(
+    "a an and are as at be been by can for from has have in into is it its of on or that the their "
+    "then there these this those to was were when which while with".split()
+)
+
+
+def _features(text: str, n_features: int) -> Counter:
+    # unigrams, 5-letter stems (so "photosynthesis" also matches "photosynthetic")
+    # and bigrams, hashed with crc32 (stable across processes, unlike hash())
+    tokens = [
+        token for token in tokenize(text)
+        if len(token) > 1 and not token.isdigit() and token not in STOP_WORDS
+    ]
+    grams = tokens + [f"{token[:5]}~" for token in tokens if len(token) > 5]
+    grams += [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return Counter(zlib.crc32(gram.encode("utf-8")) % n_features for gram in grams)
+
+
+def vectorize(texts: Iterable[str], idf: np.ndarray) -> SparseRows:
+    """L2-normalised sublinear tf-idf rows for a batch of texts."""
+    n_features = len(idf)
+    indptr = [0]
+    indices = []
+    counts = []
+    for text in texts:
+        features = _features(text or "", n_features)
+        indices.extend(features.keys())
+        counts.extend(features.values())
+        indptr.append(len(indices))
+
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    data = (1.0 + np.log(np.asarray(counts, dtype=np.float32))) * idf[indices]
+
+    # per-row l2 norm, computed over the flat value array
+    lengths = np.diff(indptr)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(lengths)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        data = (data / norms[rows]).astype(np.float32)
+    return indptr, indices, data
+
+
+def scores(batch: SparseRows, weights: np.ndarray, bias: np.ndarray) -> np.ndarray:
+    """Linear scores (documents x classes); only the weight rows a batch uses are read."""
+    indptr, indices, data = batch
+    lengths = np.diff(indptr)
+    result = np.tile(bias.astype(np.float32), (len(lengths), 1))
+    nonempty = lengths > 0
+    if nonempty.any():
+        contributions = weights[indices] * data[:, None]
+        result[nonempty] += np.add.reduceat(contributions, indptr[:-1][nonempty], axis=0)
+    return result
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+def _fit(batch: SparseRows, labels: np.ndarray, n_classes: int, n_features: int,
+         epochs: int, learning_rate: float, l2: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Softmax regression by full-batch gradient descent on sparse rows.
+
+    Only features that occur in the batch are trained; hashed buckets no
+    example used keep zero weights.
+    """
+    indptr, indices, data = batch
+    used, local_indices = np.unique(indices, return_inverse=True)
+    local_batch = (indptr, local_indices, data)
+    n_docs = len(indptr) - 1
+    targets = np.eye(n_classes, dtype=np.float32)[labels]
+
+    # X.T @ error as one reduceat over the nonzeros grouped by feature
+    order = np.argsort(local_indices, kind="stable")
+    by_feature_rows = np.repeat(np.arange(n_docs), np.diff(indptr))[order]
+    by_feature_data = data[order][:, None]
+    feature_starts = np.searchsorted(local_indices[order], np.arange(len(used)))
+
+    local_weights = np.zeros((len(used), n_classes), dtype=np.float32)
+    bias = np.zeros(n_classes, dtype=np.float32)
+    for _ in range(epochs):
+        error = (_softmax(scores(local_batch, local_weights, bias)) - targets) / n_docs
+        gradient = np.add.reduceat(by_feature_data * error[by_feature_rows], feature_starts, axis=0)
+        local_weights -= learning_rate * (gradient + l2 * local_weights)
+        bias -= learning_rate * error.sum(axis=0)
+
+    weights = np.zeros((n_features, n_classes), dtype=np.float32)
+    weights[used] = local_weights
+    return weights, bias
+
+
+class Categorizer:
+    """Hashed tf-idf features with linear subject and topic heads.
+
+    Topics are only chosen among those of the predicted subject. Weight
+    matrices are plain .npy files, memory-mapped on load, so every
+    process shares the page cache and only touched rows are read.
+    """
+
+    FILES = ("idf.npy", "subject_weights.npy", "subject_bias.npy", "topic_weights.npy", "topic_bias.npy")
+
+    def __init__(self, subjects: Sequence[str], topics: Sequence[str], topic_subjects: Sequence[int],
+                 idf: np.ndarray, subject_weights: np.ndarray, subject_bias: np.ndarray,
+                 topic_weights: np.ndarray, topic_bias: np.ndarray, min_confidence: float = 0.0):
+        self.subjects = list(subjects)
+        self.topics = list(topics)
+        self.topic_subjects = np.asarray(topic_subjects, dtype=np.int64)
+        self.idf = idf
+        self.subject_weights = subject_weights
+        self.subject_bias = subject_bias
+        self.topic_weights = topic_weights
+        self.topic_bias = topic_bias
+        self.min_confidence = min_confidence
+
+    @classmethod
+    def train(cls, examples: Sequence[Tuple[str, str, str]], n_features: int = DEFAULT_FEATURES,
+              epochs: int = 100, learning_rate: float = 30.0, l2: float = 1e-4) -> "Categorizer":
+        """Fit both heads on (subject, topic, text) examples."""
+        subjects = sorted({subject for subject, _, _ in examples})
+        topics = sorted({(subject, topic) for subject, topic, _ in examples})
+        subject_index = {name: i for i, name in enumerate(subjects)}
+        topic_index = {pair: i for i, pair in enumerate(topics)}
+
+        # smoothed idf over the training documents
+        df = np.zeros(n_features, dtype=np.float64)
+        for _, _, text in examples:
+            df[list(_features(text, n_features))] += 1
+        idf = (np.log((1 + len(examples)) / (1 + df)) + 1).astype(np.float32)
+
+        batch = vectorize((text for _, _, text in examples), idf)
+        subject_labels = np.array([subject_index[subject] for subject, _, _ in examples])
+        topic_labels = np.array([topic_index[(subject, topic)] for subject, topic, _ in examples])
+
+        subject_weights, subject_bias = _fit(batch, subject_labels, len(subjects), n_features, epochs, learning_rate, l2)
+        topic_weights, topic_bias = _fit(batch, topic_labels, len(topics), n_features, epochs, learning_rate, l2)
+
+        return cls(
+            subjects=subjects,
+            topics=[topic for _, topic in topics],
+            topic_subjects=[subject_index[subject] for subject, _ in topics],
+            idf=idf,
+            subject_weights=subject_weights,
+            subject_bias=subject_bias,
+            topic_weights=topic_weights,
+            topic_bias=topic_bias,
+        )
+
+    def save(self, directory: str) -> None:
+        """Write the model files, replacing each one atomically."""
+        os.makedirs(directory, exist_ok=True)
+        arrays = (self.idf, self.subject_weights, self.subject_bias, self.topic_weights, self.topic_bias)
+        for name, array in zip(self.FILES, arrays):
+            self._replace(directory, name, lambda f, array=array: np.save(f, np.asarray(array)))
+        # model.json last: a directory only counts as a model once it exists
+        meta = {
+            "version": MODEL_VERSION,
+            "features": len(self.idf),
+            "subjects": self.subjects,
+            "topics": self.topics,
+            "topic_subjects": self.topic_subjects.tolist(),
+        }
+        self._replace(directory, "model.json", lambda f: f.write(json.dumps(meta, indent=2).encode("utf-8")))
+
+    @staticmethod
+    def _replace(directory: str, name: str, write) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, os.path.join(directory, name))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, "model.json"))
+
+    @classmethod
+    def load(cls, directory: str, min_confidence: float = 0.0) -> "Categorizer":
+        with open(os.path.join(directory, "model.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != MODEL_VERSION:
+            raise ValueError(f"Unsupported categorizer model version: {meta.get('version')}")
+
+        idf, subject_weights, subject_bias, topic_weights, topic_bias = (
+            np.load(os.path.join(directory, name), mmap_mode="r") for name in cls.FILES
+        )
+        return cls(
+            subjects=meta["subjects"],
+            topics=meta["topics"],
+            topic_subjects=meta["topic_subjects"],
+            idf=idf,
+            subject_weights=subject_weights,
+            subject_bias=np.asarray(subject_bias),
+            topic_weights=topic_weights,
+            topic_bias=np.asarray(topic_bias),
+            min_confidence=min_confidence,
+        )
+
+    def categorize_batch(self, texts: Sequence[str], batch_size: int = 1000) -> List[Optional[Category]]:
+        """Categories for many texts at once (None where the subject is below min_confidence).
+
+        Texts are scored batch_size at a time, which keeps the per-batch
+        arrays (nonzeros x classes) small however many texts are passed.
+        """
+        results = []
+        for start in range(0, len(texts), batch_size):
+            results.extend(self._categorize_chunk(texts[start:start + batch_size]))
+        return results
+
+    def _categorize_chunk(self, texts: Sequence[str]) -> List[Optional[Category]]:
+        batch = vectorize(texts, self.idf)
+        has_text = np.diff(batch[0]) > 0
+
+        subject_probs = _softmax(scores(batch, self.subject_weights, self.subject_bias))
+        best_subjects = subject_probs.argmax(axis=1)
+
+        # topics of other subjects are masked out before the softmax
+        topic_logits = scores(batch, self.topic_weights, self.topic_bias)
+        allowed = self.topic_subjects[None, :] == best_subjects[:, None]
+        topic_probs = _softmax(np.where(allowed, topic_logits, -np.inf))
+        best_topics = topic_probs.argmax(axis=1)
+
+        results = []
+        for i in range(len(texts)):
+            subject_confidence = float(subject_probs[i, best_subjects[i]])
+            if not has_text[i] or subject_confidence < self.min_confidence:
+                results.append(None)
+                continue
+            topic_confidence = float(topic_probs[i, best_topics[i]])
+            results.append(Category(
+                subject=self.subjects[best_subjects[i]],
+                topic=self.topics[best_topics[i]] if topic_confidence >= self.min_confidence else None,
+                subject_confidence=subject_confidence,
+                topic_confidence=topic_confidence,
+            ))
+        return results
+
+    def categorize(self, text: str) -> Optional[Category]:
+        return self.categorize_batch([text])[0]
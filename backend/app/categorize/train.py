@@ -0,0 +1,64 @@
+"""Train the subject/topic categorizer and write it to the model directory.
+
+Usage (from the backend directory):
+
+    python -m app.categorize.train [--corpus seed_corpus.tsv] [--output ./data/categorizer]
+                                   [--features 65536] [--from-notes]
+
+The corpus is tab-separated `subject<TAB>topic<TAB>text`, one note per
+line. --from-notes adds every completed note whose subject and topic
+were set, so the model learns the labels users actually pick.
+"""
+import argparse
+import time
+
+from sqlalchemy import select
+
+from app.categorize.model import DEFAULT_FEATURES, SEED_CORPUS, Categorizer, load_corpus
+from app.config import get_settings
+from app.database import SessionLocal, create_tables
+from app.models.note import Note, ProcessingStatus
+
+
+def labelled_notes():
+    create_tables()
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(Note.subject, Note.topic, Note.raw_text).where(
+                Note.status == ProcessingStatus.COMPLETED,
+                Note.subject.is_not(None),
+                Note.topic.is_not(None),
+                Note.raw_text.is_not(None),
+            )
+        )
+        return [tuple(row) for row in rows]
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the note categorizer.")
+    parser.add_argument("--corpus", default=SEED_CORPUS, help="tab-separated training examples")
+    parser.add_argument("--output", default=get_settings().categorizer_model_dir, help="model directory")
+    parser.add_argument("--features", type=int, default=DEFAULT_FEATURES, help="hashed feature count")
+    parser.add_argument("--from-notes", action="store_true", help="also train on manually labelled notes")
+    args = parser.parse_args()
+
+    examples = load_corpus(args.corpus)
+    if args.from_notes:
+        examples += labelled_notes()
+
+    started = time.perf_counter()
+    categorizer = Categorizer.train(examples, n_features=args.features)
+    categorizer.save(args.output)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"Trained on {len(examples)} examples ({len(categorizer.subjects)} subjects, "
+        f"{len(categorizer.topics)} topics) in {elapsed:.2f}s; saved to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
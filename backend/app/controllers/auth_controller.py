@@ -1,15 +1,17 @@
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
-import bcrypt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
 from app.schemas.user_schema import UserCreate, TokenData
+from app.services.password_hasher import HasherBusyError, password_hasher
+from app.services.user_cache import token_cache, user_cache
 
 settings = get_settings()
 
@@ -21,18 +23,21 @@ class AuthController:
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash."""
-        return bcrypt.checkpw(
-            plain_password.encode('utf-8'), 
-            hashed_password.encode('utf-8')
-        )
+        """Verify a password against its hash (blocking; for scripts)."""
+        return password_hasher.verify_sync(plain_password, hashed_password)
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash a password."""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        """Hash a password with the configured cost (blocking; for scripts)."""
+        return password_hasher.hash_sync(password)
+    
+    @staticmethod
+    def _hashing_busy() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
     
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -50,31 +55,35 @@ class AuthController:
         return encoded_jwt
     
     @staticmethod
-    def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
         """Get a user by email."""
-        return db.query(User).filter(User.email == email).first()
+        return await db.scalar(select(User).where(User.email == email).limit(1))
     
     @staticmethod
-    def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
         """Get a user by username."""
-        return db.query(User).filter(User.username == username).first()
+        return await db.scalar(select(User).where(User.username == username).limit(1))
     
     @staticmethod
-    def create_user(db: Session, user_data: UserCreate) -> User:
+    async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
         """Create a new user."""
-        if AuthController.get_user_by_email(db, user_data.email):
+        if await AuthController.get_user_by_email(db, user_data.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
         
-        if AuthController.get_user_by_username(db, user_data.username):
+        if await AuthController.get_user_by_username(db, user_data.username):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already taken"
             )
         
-        hashed_password = AuthController.hash_password(user_data.password)
+        # bcrypt is deliberately slow; it runs on the bounded hashing pool
+        try:
+            hashed_password = await password_hasher.hash(user_data.password)
+        except HasherBusyError:
+            raise AuthController._hashing_busy()
         db_user = User(
             email=user_data.email,
             username=user_data.username,
@@ -82,27 +91,38 @@ class AuthController:
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
         return db_user
     
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
         """Authenticate a user by email and password."""
-        user = AuthController.get_user_by_email(db, email)
+        user = await AuthController.get_user_by_email(db, email)
         
         if not user:
             return None
-        if not AuthController.verify_password(password, user.hashed_password):
-            return None
+        try:
+            if not await password_hasher.verify(password, user.hashed_password):
+                return None
+        except HasherBusyError:
+            raise AuthController._hashing_busy()
+        
+        # Upgrade hashes made with an older cost factor while we have the password
+        if password_hasher.needs_rehash(user.hashed_password):
+            try:
+                user.hashed_password = await password_hasher.hash(password)
+                await db.commit()
+            except HasherBusyError:
+                pass  # the upgrade can wait for the next login
         
         return user
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Dependency to get the current authenticated user."""
     credentials_exception = HTTPException(
@@ -111,27 +131,38 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id = payload.get("sub")
-        if user_id is not None:
-            user_id = int(user_id)
-        email = payload.get("email")
-        
-        if user_id is None:
-            raise credentials_exception
+    # a token that already verified maps straight to its user id until it expires
+    user_id = token_cache.get(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+            user_id = payload.get("sub")
+            if user_id is not None:
+                user_id = int(user_id)
+            email = payload.get("email")
             
-        token_data = TokenData(user_id=user_id, email=email)
-    except jwt.PyJWTError:
-        raise credentials_exception
+            if user_id is None:
+                raise credentials_exception
+                
+            token_data = TokenData(user_id=user_id, email=email)
+        except jwt.PyJWTError:
+            raise credentials_exception
+        
+        user_id = token_data.user_id
+        token_cache.put(token, user_id, payload.get("exp"))
+    
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = await db.get(User, user_id)
     
     if user is None:
         raise credentials_exception
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
+    user_cache.put(user)
     return user
 
 
@@ -1,17 +1,53 @@
-from typing import List, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+import uuid
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from fastapi import HTTPException, status, UploadFile
+from starlette.concurrency import run_in_threadpool
 import base64
 
 from app.models.note import Note, ProcessingStatus
+from app.config import get_settings
 from app.models.user import User
+from app.search import get_search_index
 from app.schemas.note_schema import NoteUpdate
+from app.services.ocr_jobs import ocr_queue
+from app.storage import get_blob_store, BlobNotFoundError
 
-# Import OCR service
-import sys
-sys.path.insert(0, '..')
-from ocr_service import extract_structured_text
+settings = get_settings()
+
+# columns the note list loads
+SUMMARY_COLUMNS = (
+    Note.id,
+    Note.title,
+    Note.image_filename,
+    Note.status,
+    Note.created_at,
+    Note.subject,
+    Note.topic,
+    Note.thumbnail_key
+)
+
+
+def encode_cursor(note: Note) -> str:
+    """Opaque cursor pointing just past `note` in the newest-first note list."""
+    raw = f"{note.created_at.isoformat()},{note.id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """The (created_at, id) a cursor points past; 400 when it was not made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, note_id = raw.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(note_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
 
 
 class NoteController:
@@ -19,114 +55,173 @@ class NoteController:
     
     @staticmethod
     async def create_note(
-        db: Session,
+        db: AsyncSession,
         file: UploadFile,
         user: User,
         title: Optional[str] = None
     ) -> Note:
-        """Create a new note from an uploaded image."""
-        file_content = await file.read()
+        """Create a new note from an uploaded image and queue it for OCR."""
+        note = await NoteController._store_upload(file, user, title)
+        
+        # OCR runs in the background worker pool
+        db.add(note)
+        await db.commit()
+        await db.refresh(note)
+        
+        ocr_queue.submit(note.id)
+        
+        return note
+    
+    @staticmethod
+    async def create_notes_batch(
+        db: AsyncSession,
+        files: List[UploadFile],
+        user: User
+    ) -> dict:
+        """Create one note per uploaded page and fan OCR out to the worker pool."""
+        if not files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No files uploaded"
+            )
+        if len(files) > settings.max_batch_files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A batch can contain at most {settings.max_batch_files} files"
+            )
+        
+        batch_id = uuid.uuid4().hex
+        
+        # Copy each file into the blob store as we go, then insert all rows in one transaction
+        notes = []
+        for file in files:
+            note = await NoteController._store_upload(file, user)
+            note.batch_id = batch_id
+            notes.append(note)
+        
+        db.add_all(notes)
+        await db.commit()
+        
+        for note in notes:
+            ocr_queue.submit(note.id)
+        
+        return {
+            "batch_id": batch_id,
+            "total": len(notes),
+            "notes": [
+                {"id": note.id, "title": note.title, "image_filename": note.image_filename}
+                for note in notes
+            ],
+        }
+    
+    @staticmethod
+    async def get_batch_progress(db: AsyncSession, batch_id: str, user: User) -> dict:
+        """Per-status counts for the notes of a batch upload."""
+        rows = (await db.execute(
+            select(Note.status, func.count(Note.id)).where(
+                Note.batch_id == batch_id,
+                Note.owner_id == user.id
+            ).group_by(Note.status)
+        )).all()
+        
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Batch not found"
+            )
+        
+        counts = {s.value: 0 for s in ProcessingStatus}
+        for note_status, count in rows:
+            counts[note_status.value] = count
+        
+        total = sum(counts.values())
+        finished = counts[ProcessingStatus.COMPLETED.value] + counts[ProcessingStatus.FAILED.value]
         
-        # Create note record
-        note = Note(
+        return {
+            "batch_id": batch_id,
+            "total": total,
+            **counts,
+            "done": finished == total,
+        }
+    
+    @staticmethod
+    async def _store_upload(file: UploadFile, user: User, title: Optional[str] = None) -> Note:
+        """Stream an upload into the blob store and build its (unsaved) note."""
+        image_key, image_size = await run_in_threadpool(get_blob_store().put_file, file.file)
+        
+        return Note(
             title=title or file.filename,
-            original_image=file_content,
+            image_key=image_key,
+            image_size=image_size,
             image_filename=file.filename or "uploaded_image",
             image_mimetype=file.content_type or "image/png",
-            status=ProcessingStatus.PROCESSING,
+            status=ProcessingStatus.PENDING,
             owner_id=user.id
         )
-        
-        db.add(note)
-        db.commit()
-        db.refresh(note)
-        
-        # Perform OCR
-        try:
-            ocr_result = extract_structured_text(file_content)
-            
-            # Build raw_text from the new structured format
-            text_parts = []
-            
-            # Add headers
-            if ocr_result.get('headers'):
-                text_parts.extend(ocr_result['headers'])
-            
-            # Add paragraphs
-            if ocr_result.get('paragraphs'):
-                text_parts.extend(ocr_result['paragraphs'])
-            
-            # Add bullet points
-            if ocr_result.get('bullet_points'):
-                text_parts.extend(ocr_result['bullet_points'])
-            
-            # Add key-values (now it's a list or dict)
-            key_values = ocr_result.get('key_values', {})
-            if isinstance(key_values, dict):
-                for k, v in key_values.items():
-                    text_parts.append(f"{k}: {v}")
-            elif isinstance(key_values, list):
-                text_parts.extend([str(kv) for kv in key_values])
-            
-            # Add tables
-            if ocr_result.get('tables'):
-                for table in ocr_result['tables']:
-                    if isinstance(table, list):
-                        for row in table:
-                            if isinstance(row, list):
-                                text_parts.append(' | '.join(row))
-                            else:
-                                text_parts.append(str(row))
-            
-            # Add sections content
-            if ocr_result.get('sections'):
-                for section in ocr_result['sections']:
-                    if section.get('title'):
-                        text_parts.append(section['title'])
-                    for item in section.get('content', []):
-                        if isinstance(item, dict) and item.get('text'):
-                            text_parts.append(item['text'])
-            
-            raw_text = '\n'.join(text_parts) if text_parts else ''
-            
-            if not raw_text and ocr_result.get('raw_text'):
-                raw_text = ocr_result['raw_text']
-
-            note.raw_text = raw_text
-            note.structured_text = raw_text
-            note.status = ProcessingStatus.COMPLETED
-            note.processed_at = datetime.utcnow()
-            
-            db.commit()
-            db.refresh(note)
-            
-        except Exception as e:
-            note.status = ProcessingStatus.FAILED
-            note.error_message = str(e)
-            db.commit()
-            db.refresh(note)
-        
-        return note
     
     @staticmethod
-    def get_notes(
-        db: Session,
+    async def get_notes(
+        db: AsyncSession,
         user: User,
         skip: int = 0,
         limit: int = 100
     ) -> List[Note]:
-        """Get all notes for a user."""
-        return db.query(Note).filter(
+        """Get all notes for a user (summary columns only), by offset."""
+        result = await db.scalars(select(Note).options(
+            load_only(*SUMMARY_COLUMNS)
+        ).where(
             Note.owner_id == user.id
-        ).order_by(Note.created_at.desc()).offset(skip).limit(limit).all()
+        ).order_by(Note.created_at.desc(), Note.id.desc()).offset(skip).limit(limit))
+        return result.all()
+    
+    @staticmethod
+    async def get_notes_page(
+        db: AsyncSession,
+        user: User,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Note], Optional[str]]:
+        """One page of a user's notes after `cursor`, plus the cursor of the next page.
+        
+        Seeks straight to the position in ix_notes_owner_created, so a deep
+        page costs the same as the first and inserts never shift results.
+        """
+        query = select(Note).options(
+            load_only(*SUMMARY_COLUMNS)
+        ).where(Note.owner_id == user.id)
+        
+        if cursor:
+            created_at, note_id = decode_cursor(cursor)
+            # typed literals so the values bind in the column's storage format
+            query = query.where(tuple_(Note.created_at, Note.id) < tuple_(
+                literal(created_at, Note.created_at.type),
+                literal(note_id, Note.id.type)
+            ))
+        
+        # one extra row tells whether there is a next page
+        notes = (await db.scalars(
+            query.order_by(Note.created_at.desc(), Note.id.desc()).limit(limit + 1)
+        )).all()
+        
+        if len(notes) <= limit or limit < 1:
+            return list(notes[:max(limit, 0)]), None
+        notes = list(notes[:limit])
+        return notes, encode_cursor(notes[-1])
+    
+    @staticmethod
+    async def search_notes(db: AsyncSession, user: User, query: str, limit: int = 20) -> List[dict]:
+        """Full-text search over a user's notes, best match first."""
+        # search backends work on a sync Session; run_sync hands them the one behind db
+        index = get_search_index()
+        return await db.run_sync(index.search, user.id, query, limit)
     
     @staticmethod
-    def get_note(db: Session, note_id: int, user: User) -> Note:
+    async def get_note(db: AsyncSession, note_id: int, user: User) -> Note:
         """Get a specific note by ID."""
-        note = db.query(Note).filter(
+        note = await db.scalar(select(Note).where(
             Note.id == note_id,
             Note.owner_id == user.id
-        ).first()
+        ).limit(1))
         
         if not note:
             raise HTTPException(
@@ -137,16 +232,53 @@ class NoteController:
         return note
     
     @staticmethod
-    def get_note_with_image(db: Session, note_id: int, user: User) -> dict:
+    async def get_note_status(db: AsyncSession, note_id: int, user: User) -> dict:
+        """Get the processing status of a note without loading its content."""
+        row = (await db.execute(select(
+            Note.id,
+            Note.status,
+            Note.error_message,
+            Note.processed_at
+        ).where(
+            Note.id == note_id,
+            Note.owner_id == user.id
+        ).limit(1))).first()
+        
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Note not found"
+            )
+        
+        return {
+            "id": row.id,
+            "status": row.status.value if hasattr(row.status, 'value') else str(row.status),
+            "error_message": row.error_message,
+            "processed_at": row.processed_at,
+        }
+    
+    @staticmethod
+    async def get_note_with_image(db: AsyncSession, note_id: int, user: User) -> dict:
         """Get a note with its image as base64."""
-        note = NoteController.get_note(db, note_id, user)
+        note = await NoteController.get_note(db, note_id, user)
+        
+        try:
+            # notes from before the blob store have no key until app.storage.backfill runs
+            if not note.image_key:
+                raise BlobNotFoundError(note_id)
+            image_bytes = await run_in_threadpool(get_blob_store().get, note.image_key)
+        except BlobNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Note image not found"
+            )
         
         return {
             "id": note.id,
             "title": note.title,
             "image_filename": note.image_filename,
             "image_mimetype": note.image_mimetype,
-            "image_base64": base64.b64encode(note.original_image).decode('utf-8'),
+            "image_base64": base64.b64encode(image_bytes).decode('utf-8'),
             "raw_text": note.raw_text,
             "structured_text": note.structured_text,
             "subject": note.subject,
@@ -159,25 +291,77 @@ class NoteController:
         }
     
     @staticmethod
-    def update_note(db: Session, note_id: int, update_data: NoteUpdate, user: User) -> Note:
+    async def get_note_image(db: AsyncSession, note_id: int, user: User) -> Note:
+        """Get the image metadata of a note, checking that the blob exists."""
+        note = await db.scalar(select(Note).options(
+            load_only(Note.id, Note.image_key, Note.image_size, Note.image_mimetype)
+        ).where(
+            Note.id == note_id,
+            Note.owner_id == user.id
+        ).limit(1))
+        
+        if not note or not note.image_key or not await run_in_threadpool(get_blob_store().exists, note.image_key):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Note image not found"
+            )
+        
+        if note.image_size is None:
+            note.image_size = await run_in_threadpool(get_blob_store().size, note.image_key)
+        
+        return note
+    
+    @staticmethod
+    async def get_note_preview_key(db: AsyncSession, note_id: int, user: User, size: str) -> Tuple[str, int]:
+        """Get the blob key and byte size of a generated preview ("thumbnail" or "preview")."""
+        not_available = HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Preview not available"
+        )
+        column = Note.thumbnail_key if size == "thumbnail" else Note.preview_key
+        row = (await db.execute(select(column).where(
+            Note.id == note_id,
+            Note.owner_id == user.id
+        ).limit(1))).first()
+        
+        if not row or not row[0]:
+            raise not_available
+        
+        try:
+            blob_size = await run_in_threadpool(get_blob_store().size, row[0])
+        except BlobNotFoundError:
+            raise not_available
+        
+        return row[0], blob_size
+    
+    @staticmethod
+    async def update_note(db: AsyncSession, note_id: int, update_data: NoteUpdate, user: User) -> Note:
         """Update a note."""
-        note = NoteController.get_note(db, note_id, user)
+        note = await NoteController.get_note(db, note_id, user)
         
         update_dict = update_data.model_dump(exclude_unset=True)
         for field, value in update_dict.items():
             setattr(note, field, value)
         
-        db.commit()
-        db.refresh(note)
+        # Keep the search index in the same transaction as the edit
+        if "title" in update_dict or "structured_text" in update_dict:
+            await db.run_sync(get_search_index().index_note, note)
+        
+        await db.commit()
+        await db.refresh(note)
         
         return note
     
     @staticmethod
-    def delete_note(db: Session, note_id: int, user: User) -> None:
+    async def delete_note(db: AsyncSession, note_id: int, user: User) -> None:
         """Delete a note."""
-        note = NoteController.get_note(db, note_id, user)
-        db.delete(note)
-        db.commit()
+        note = await NoteController.get_note(db, note_id, user)
+        await db.delete(note)
+        await db.run_sync(get_search_index().remove_note, note_id)
+        await db.commit()
+        
+        # Blobs are content-addressed and may be shared with a concurrent upload of
+        # the same bytes, so they are left for `python -m app.storage.gc` to remove
 
 
 note_controller = NoteController()
\ No newline at end of file
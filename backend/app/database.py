@@ -1,24 +1,157 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from typing import List
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import get_settings
 
+from instrumentation import DB_TRANSACTION_SECONDS, is_enabled
+
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
-engine = create_engine(settings.database_url, echo=True)
+# async driver used by the API for each sync driver the workers and CLI use
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """The same database as `url`, reached through an asyncio driver."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or parsed.drivername == driver:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def pool_options(url: str) -> dict:
+    """Connection pool settings from Settings (SQLite keeps SQLAlchemy's defaults)."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_timeout": settings.database_pool_timeout,
+        "pool_recycle": settings.database_pool_recycle,
+        "pool_pre_ping": settings.database_pool_pre_ping,
+    }
+
+
+# Sync engine for the OCR workers, startup and CLI scripts
+engine = create_engine(
+    settings.database_url,
+    echo=settings.database_echo,
+    **pool_options(settings.database_url)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine for request handlers, so DB calls never block the event loop
+async_engine = create_async_engine(
+    async_database_url(settings.database_url),
+    echo=settings.database_echo,
+    **pool_options(settings.database_url)
+)
+
+
+class AsyncBackedSession(Session):
+    """The sync session behind each AsyncSession (a subclass so its events stay separate)."""
+
+
+# Objects stay loaded after commit: an expired attribute cannot lazy-load outside a greenlet
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    sync_session_class=AsyncBackedSession
+)
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency that provides a database session."""
-    db = SessionLocal()
-    try:
+# time each session transaction from its first statement to commit/rollback
+def _transaction_began(session, transaction, connection):
+    session.info.setdefault("transaction_started", time.perf_counter())
+
+
+def _transaction_committed(session):
+    started = session.info.pop("transaction_started", None)
+    if started is not None and is_enabled():
+        DB_TRANSACTION_SECONDS.observe(time.perf_counter() - started, outcome="commit")
+
+
+def _transaction_ended(session, transaction):
+    # anything still open when the root transaction ends was rolled back (or closed without commit)
+    if transaction.parent is not None:
+        return
+    started = session.info.pop("transaction_started", None)
+    if started is not None and is_enabled():
+        DB_TRANSACTION_SECONDS.observe(time.perf_counter() - started, outcome="rollback")
+
+
+for _target in (SessionLocal, AsyncBackedSession):
+    event.listen(_target, "after_begin", _transaction_began)
+    event.listen(_target, "after_commit", _transaction_committed)
+    event.listen(_target, "after_transaction_end", _transaction_ended)
+
+
+async def get_async_db():
+    """Dependency that provides an async database session."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def create_tables():
-    """Create all database tables."""
+def create_tables() -> List[str]:
+    """Create all database tables, and bring existing ones up to the models.
+    
+    There are no migrations: columns added to a model since its table was
+    created are added (nullable, so existing rows stay valid), retired
+    columns stop being required where the database allows it, and new
+    indexes are created. Returns the retired columns ("table.column") that
+    are still NOT NULL, which block inserts until their data is moved out.
+    """
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, including anything declared on them since
+    blocking = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            blocking += _upgrade_columns(conn, table)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    return blocking
+
+
+def _upgrade_columns(conn, table) -> List[str]:
+    preparer = conn.dialect.identifier_preparer
+    existing = {column["name"]: column for column in inspect(conn).get_columns(table.name)}
+    
+    for column in table.columns:
+        if column.name not in existing:
+            logger.info("Adding column %s.%s", table.name, column.name)
+            conn.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.quote(column.name)} {column.type.compile(dialect=conn.dialect)}"
+            ))
+    
+    blocking = []
+    for name in table.info.get("retired_columns", ()):
+        if name not in existing or existing[name]["nullable"]:
+            continue
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} ALTER COLUMN {preparer.quote(name)} DROP NOT NULL"
+            ))
+        else:
+            # SQLite cannot relax NOT NULL in place; inserts fail until the column is dropped
+            blocking.append(f"{table.name}.{name}")
+    return blocking
+
+
+async def dispose_engines():
+    """Close the pooled connections of the async engine."""
+    await async_engine.dispose()
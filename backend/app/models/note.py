@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 from app.database import Base
 
 
+# SQLite fills server_default=now() with CURRENT_TIMESTAMP, which has no fractional
+# seconds; bind datetimes in the same text format so comparisons against it are exact
+SQLITE_TIMESTAMP = sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+)
+
+
 class ProcessingStatus(enum.Enum):
     PENDING = "pending"
     PROCESSING = "processing"
@@ -16,12 +24,22 @@ class Note(Base):
     """Note model for storing uploaded notes."""
     
     __tablename__ = "notes"
+    __table_args__ = (
+        # Serves the note list (newest first) and its keyset pagination
+        Index("ix_notes_owner_created", "owner_id", "created_at", "id"),
+        # Columns older databases still have; create_tables() stops requiring them
+        # and `python -m app.storage.backfill` moves their data out and drops them
+        {"info": {"retired_columns": ("original_image",)}},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255))
     
-    # Image storage
-    original_image = Column(LargeBinary, nullable=False)
+    # Image storage (the bytes live in the blob store, keyed by content hash)
+    image_key = Column(String(64), nullable=False, index=True)
+    image_size = Column(Integer)
+    thumbnail_key = Column(String(64))
+    preview_key = Column(String(64))
     image_filename = Column(String(255))
     image_mimetype = Column(String(100))
     
@@ -37,9 +55,15 @@ class Note(Base):
     # Status
     status = Column(Enum(ProcessingStatus), default=ProcessingStatus.PENDING)
     error_message = Column(Text)
+    batch_id = Column(String(36), index=True)
+    # When an OCR worker moved the note to PROCESSING (its claim on the job)
+    claimed_at = Column(DateTime(timezone=True))
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(
+        DateTime(timezone=True).with_variant(SQLITE_TIMESTAMP, "sqlite"),
+        server_default=func.now()
+    )
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     processed_at = Column(DateTime(timezone=True))
     
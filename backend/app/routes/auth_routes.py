@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.schemas.user_schema import UserCreate, UserLogin, UserResponse, Token
 from app.controllers.auth_controller import auth_controller, get_current_user
 from app.models.user import User
@@ -10,16 +10,16 @@ router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
-    user = auth_controller.create_user(db, user_data)
+    user = await auth_controller.create_user(db, user_data)
     return user
 
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login and get access token."""
-    user = auth_controller.authenticate_user(db, credentials.email, credentials.password)
+    user = await auth_controller.authenticate_user(db, credentials.email, credentials.password)
     
     if not user:
         raise HTTPException(
@@ -36,6 +36,6 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user)):
     """Get current user info."""
     return current_user
@@ -1,24 +1,27 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.schemas.note_schema import NoteUpdate
 from app.models.user import User
 from app.controllers.note_controller import note_controller
 from app.controllers.auth_controller import get_current_user
+from app.services.previews import preview_mimetype
+from app.storage import get_blob_store
+from app.storage.responses import blob_response
 
 router = APIRouter(prefix="/api/notes", tags=["Notes"])
 
 
-@router.post("/upload")
+@router.post("/upload", status_code=status.HTTP_202_ACCEPTED)
 async def upload_note(
     file: UploadFile = File(...),
     title: Optional[str] = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Upload and process a note."""
+    """Upload a note and queue it for processing."""
     note = await note_controller.create_note(db, file, current_user, title)
     return {
         "id": note.id,
@@ -29,15 +32,53 @@ async def upload_note(
     }
 
 
+@router.post("/upload/batch", status_code=status.HTTP_202_ACCEPTED)
+async def upload_notes_batch(
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload several pages at once and queue them for processing."""
+    return await note_controller.create_notes_batch(db, files, current_user)
+
+
+@router.get("/batches/{batch_id}")
+async def get_batch_progress(
+    batch_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Poll the progress of a batch upload."""
+    return await note_controller.get_batch_progress(db, batch_id, current_user)
+
+
 @router.get("/")
-def get_notes(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+async def get_notes(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all notes for current user."""
-    notes = note_controller.get_notes(db, current_user, skip, limit)
+    """Get notes for current user, newest first.
+    
+    Pages are chained with the X-Next-Cursor response header (absent on the
+    last page). `skip` keeps the old offset paging for existing clients.
+    """
+    if skip and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either skip or cursor, not both"
+        )
+    
+    if skip:
+        notes = await note_controller.get_notes(db, current_user, skip, limit)
+    else:
+        notes, next_cursor = await note_controller.get_notes_page(db, current_user, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    
     return [
         {
             "id": n.id,
@@ -46,58 +87,126 @@ def get_notes(
             "status": n.status.value if hasattr(n.status, 'value') else str(n.status),
             "created_at": n.created_at,
             "subject": n.subject,
-            "topic": n.topic
+            "topic": n.topic,
+            "thumbnail_url": f"/api/notes/{n.id}/thumbnail" if n.thumbnail_key else None
         }
         for n in notes
     ]
 
 
+@router.get("/search")
+async def search_notes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Full-text search over the current user's notes."""
+    return await note_controller.search_notes(db, current_user, q, limit)
+
+
 @router.get("/{note_id}")
-def get_note(
+async def get_note(
     note_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get a specific note."""
-    note = note_controller.get_note(db, note_id, current_user)
+    """Get a specific note without its image (stream that from /image)."""
+    note = await note_controller.get_note(db, note_id, current_user)
     return {
         "id": note.id,
         "title": note.title,
+        "image_filename": note.image_filename,
+        "image_mimetype": note.image_mimetype,
         "raw_text": note.raw_text,
         "structured_text": note.structured_text,
+        "subject": note.subject,
+        "topic": note.topic,
+        "tags": note.tags,
         "status": note.status.value if hasattr(note.status, 'value') else str(note.status),
-        "created_at": note.created_at
+        "error_message": note.error_message,
+        "created_at": note.created_at,
+        "processed_at": note.processed_at,
+        "thumbnail_url": f"/api/notes/{note.id}/thumbnail" if note.thumbnail_key else None
     }
 
 
+@router.get("/{note_id}/status")
+async def get_note_status(
+    note_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Poll the processing status of a note."""
+    return await note_controller.get_note_status(db, note_id, current_user)
+
+
+@router.get("/{note_id}/image")
+async def get_note_image(
+    note_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the original image (supports ETag and Range requests)."""
+    note = await note_controller.get_note_image(db, note_id, current_user)
+    return blob_response(
+        request,
+        get_blob_store(),
+        note.image_key,
+        note.image_size,
+        note.image_mimetype or "application/octet-stream"
+    )
+
+
+@router.get("/{note_id}/thumbnail")
+async def get_note_thumbnail(
+    note_id: int,
+    request: Request,
+    size: Literal["thumbnail", "preview"] = "thumbnail",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Serve a downscaled preview generated after upload."""
+    key, blob_size = await note_controller.get_note_preview_key(db, note_id, current_user, size)
+    return blob_response(
+        request,
+        get_blob_store(),
+        key,
+        blob_size,
+        preview_mimetype(),
+        cache_control="private, max-age=604800"
+    )
+
+
 @router.get("/{note_id}/full")
-def get_note_full(
+async def get_note_full(
     note_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a note with image."""
-    return note_controller.get_note_with_image(db, note_id, current_user)
+    return await note_controller.get_note_with_image(db, note_id, current_user)
 
 
 @router.put("/{note_id}")
-def update_note(
+async def update_note(
     note_id: int,
     update_data: NoteUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update a note."""
-    note = note_controller.update_note(db, note_id, update_data, current_user)
+    note = await note_controller.update_note(db, note_id, update_data, current_user)
     return {"message": "Note updated", "id": note.id}
 
 
 @router.delete("/{note_id}")
-def delete_note(
+async def delete_note(
     note_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a note."""
-    note_controller.delete_note(db, note_id, current_user)
+    await note_controller.delete_note(db, note_id, current_user)
     return {"message": "Note deleted"}
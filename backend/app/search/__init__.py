@@ -0,0 +1,41 @@
+from functools import lru_cache
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import engine
+from app.search.base import SearchIndex
+from app.search.memory import MemorySearchIndex
+from app.search.postgres import PostgresSearchIndex
+from app.search.sqlite import SQLiteFTSSearchIndex
+
+
+def sqlite_has_fts5() -> bool:
+    """Whether the SQLite library behind the engine was built with FTS5."""
+    with engine.connect() as conn:
+        options = {row[0] for row in conn.execute(text("PRAGMA compile_options"))}
+    return "ENABLE_FTS5" in options
+
+
+@lru_cache()
+def get_search_index() -> SearchIndex:
+    """Return the process-wide search index for the configured database."""
+    backend = get_settings().search_backend
+    
+    if backend == "auto":
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            backend = "postgres"
+        elif dialect == "sqlite" and sqlite_has_fts5():
+            backend = "sqlite_fts5"
+        else:
+            backend = "memory"
+    
+    if backend == "postgres":
+        return PostgresSearchIndex()
+    if backend == "sqlite_fts5":
+        return SQLiteFTSSearchIndex()
+    if backend == "memory":
+        return MemorySearchIndex()
+    
+    raise ValueError(f"Unknown search backend: {backend}")
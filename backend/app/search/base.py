@@ -0,0 +1,117 @@
+import html
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.note import Note, ProcessingStatus
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+# private-use characters that delimit matches until the snippet is escaped;
+# the database backends have their snippet functions emit these
+MATCH_START = "\ue000"
+MATCH_END = "\ue001"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used by the in-process backends."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def note_document(note: Note) -> Tuple[str, str]:
+    """The (title, body) pair a note is indexed under."""
+    return note.title or "", note.structured_text or ""
+
+
+def render_snippet(snippet: str) -> str:
+    """HTML-escape a snippet whose matches are delimited by MATCH_START/MATCH_END, then mark them."""
+    escaped = html.escape(snippet or "", quote=False)
+    return escaped.replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_END, HIGHLIGHT_END)
+
+
+def highlight_snippet(text: str, terms: Iterable[str], width: int = 160) -> str:
+    """Cut a window around the first matching term, HTML-escape it and wrap matches in <mark>."""
+    terms = [t for t in terms if t]
+    if not text:
+        return ""
+    text = text.replace(MATCH_START, "").replace(MATCH_END, "")
+    if not terms:
+        return render_snippet(text[:width])
+    
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+    first = pattern.search(text)
+    start = 0 if first is None else max(first.start() - width // 3, 0)
+    end = min(start + width, len(text))
+    
+    window = text[start:end]
+    snippet = pattern.sub(lambda m: f"{MATCH_START}{m.group(0)}{MATCH_END}", window)
+    
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(text):
+        snippet += "…"
+    return render_snippet(snippet)
+
+
+class SearchIndex(ABC):
+    """Interface for full-text search over a user's notes.
+    
+    Hits are returned as dicts with id, title, rank (higher is better)
+    and an HTML snippet: the note text escaped, matches wrapped in <mark> tags.
+    """
+    
+    name = "base"
+    
+    def setup(self, db: Session) -> None:
+        """Create any index structures the backend needs."""
+    
+    @abstractmethod
+    def index_note(self, db: Session, note: Note) -> None:
+        """Add or replace a note in the index (caller commits)."""
+    
+    @abstractmethod
+    def remove_note(self, db: Session, note_id: int) -> None:
+        """Drop a note from the index (caller commits)."""
+    
+    def index_notes(self, db: Session, notes: Iterable[Note]) -> None:
+        """Add or replace many notes at once (caller commits)."""
+        for note in notes:
+            self.index_note(db, note)
+    
+    def clear(self, db: Session) -> None:
+        """Remove every entry from the index (caller commits)."""
+    
+    def rebuild(self, db: Session, chunk_size: int = 500) -> int:
+        """Re-index every completed note, streaming them in chunks.
+        
+        Only one chunk of notes is held in memory at a time, and each chunk
+        is committed on its own. Returns the number of notes indexed.
+        """
+        self.clear(db)
+        db.commit()
+        
+        # Plain column rows carry the same attributes index_note reads from a Note
+        rows = db.execute(
+            select(Note.id, Note.owner_id, Note.title, Note.structured_text)
+            .where(Note.status == ProcessingStatus.COMPLETED)
+            .order_by(Note.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        
+        total = 0
+        for chunk in rows.partitions(chunk_size):
+            self.index_notes(db, chunk)
+            db.commit()
+            total += len(chunk)
+        
+        return total
+    
+    @abstractmethod
+    def search(self, db: Session, owner_id: int, query: str, limit: int = 20) -> List[Dict]:
+        """Search one user's notes, best match first."""
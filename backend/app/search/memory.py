@@ -0,0 +1,167 @@
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.note import Note
+from app.search.base import SearchIndex, highlight_snippet, note_document, tokenize
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Session.info key of the index changes waiting for their transaction to commit
+PENDING_CHANGES = "memory_search_changes"
+
+
+class MemorySearchIndex(SearchIndex):
+    """In-process inverted index with BM25 ranking, partitioned by owner.
+    
+    Used when the database has no native full-text search. The index lives
+    in this process only, so it is rebuilt from the database in setup().
+    index_note/remove_note only take effect once the session commits, so
+    searches never see an edit that is later rolled back.
+    """
+    
+    name = "memory"
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        # owner_id -> term -> {note_id: term frequency}
+        self._postings: Dict[int, Dict[str, Dict[int, int]]] = defaultdict(lambda: defaultdict(dict))
+        # note_id -> (owner_id, title, body, token count)
+        self._documents: Dict[int, tuple] = {}
+        # owner_id -> total token count, for the average document length
+        self._owner_lengths: Dict[int, int] = defaultdict(int)
+        self._owner_counts: Dict[int, int] = defaultdict(int)
+    
+    def setup(self, db: Session) -> None:
+        self.rebuild(db)
+    
+    def clear(self, db: Session) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._owner_lengths.clear()
+            self._owner_counts.clear()
+    
+    def index_notes(self, db: Session, notes: Iterable[Note]) -> None:
+        # Tokenize outside the lock, then apply the whole batch in one go
+        documents = [(note, note_document(note)) for note in notes]
+        tokenized = [
+            (note, title, body, Counter(tokenize(title) + tokenize(body)))
+            for note, (title, body) in documents
+        ]
+        
+        with self._lock:
+            for note, title, body, counts in tokenized:
+                self._add(note.id, note.owner_id, title, body, counts)
+    
+    def index_note(self, db: Session, note: Note) -> None:
+        title, body = note_document(note)
+        counts = Counter(tokenize(title) + tokenize(body))
+        self._defer(db, note.id, (note.owner_id, title, body, counts))
+    
+    def remove_note(self, db: Session, note_id: int) -> None:
+        self._defer(db, note_id, None)
+    
+    def _defer(self, db: Session, note_id: int, document: Optional[tuple]) -> None:
+        # the last change to a note within a transaction wins
+        db.info.setdefault(PENDING_CHANGES, {}).setdefault(self, {})[note_id] = document
+    
+    def apply(self, changes: Dict[int, Optional[tuple]]) -> None:
+        """Apply committed changes: note_id -> (owner_id, title, body, counts), or None to remove."""
+        with self._lock:
+            for note_id, document in changes.items():
+                if document is None:
+                    self._remove(note_id)
+                else:
+                    self._add(note_id, *document)
+    
+    def search(self, db: Session, owner_id: int, query: str, limit: int = 20) -> List[Dict]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        
+        with self._lock:
+            owner_postings = self._postings.get(owner_id)
+            doc_count = self._owner_counts.get(owner_id, 0)
+            if not owner_postings or not doc_count:
+                return []
+            
+            postings = [owner_postings.get(term) for term in terms]
+            if not all(postings):
+                return []
+            
+            # AND semantics: start from the rarest term's postings
+            candidates = set(min(postings, key=len))
+            for term_postings in postings:
+                candidates.intersection_update(term_postings)
+            
+            avg_length = self._owner_lengths[owner_id] / doc_count
+            scores = {}
+            for note_id in candidates:
+                length = self._documents[note_id][3]
+                score = 0.0
+                for term_postings in postings:
+                    tf = term_postings[note_id]
+                    df = len(term_postings)
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    score += idf * tf * (BM25_K1 + 1) / norm
+                scores[note_id] = score
+            
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            documents = [(note_id, score, self._documents[note_id]) for note_id, score in best]
+        
+        return [
+            {
+                "id": note_id,
+                "title": title,
+                "rank": score,
+                "snippet": highlight_snippet(body or title, terms),
+            }
+            for note_id, score, (_, title, body, _) in documents
+        ]
+    
+    # caller must hold the lock
+    def _add(self, note_id: int, owner_id: int, title: str, body: str, counts: Counter) -> None:
+        self._remove(note_id)
+        length = sum(counts.values())
+        owner_postings = self._postings[owner_id]
+        for term, tf in counts.items():
+            owner_postings[term][note_id] = tf
+        self._documents[note_id] = (owner_id, title, body, length)
+        self._owner_lengths[owner_id] += length
+        self._owner_counts[owner_id] += 1
+    
+    # caller must hold the lock
+    def _remove(self, note_id: int) -> None:
+        document = self._documents.pop(note_id, None)
+        if document is None:
+            return
+        
+        owner_id, title, body, length = document
+        owner_postings = self._postings[owner_id]
+        for term in set(tokenize(title) + tokenize(body)):
+            term_postings = owner_postings.get(term)
+            if term_postings is not None:
+                term_postings.pop(note_id, None)
+                if not term_postings:
+                    del owner_postings[term]
+        
+        self._owner_lengths[owner_id] -= length
+        self._owner_counts[owner_id] -= 1
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session):
+    for index, changes in session.info.pop(PENDING_CHANGES, {}).items():
+        index.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_changes(session):
+    session.info.pop(PENDING_CHANGES, None)
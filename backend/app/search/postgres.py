@@ -0,0 +1,72 @@
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.note import Note, ProcessingStatus
+from app.search.base import SearchIndex, render_snippet, MATCH_START, MATCH_END
+
+# Must match the indexed expression exactly so the planner uses the GIN index
+DOCUMENT_EXPRESSION = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(structured_text, ''))"
+)
+
+# matches are delimited with MATCH_START/MATCH_END so the text can be escaped afterwards
+HEADLINE_OPTIONS = (
+    f"StartSel=\"{MATCH_START}\", StopSel=\"{MATCH_END}\", "
+    "MaxFragments=2, MaxWords=25, MinWords=8"
+)
+
+
+class PostgresSearchIndex(SearchIndex):
+    """tsvector search backed by a GIN expression index on the notes table.
+    
+    Postgres maintains the expression index itself, so indexing hooks are
+    no-ops here.
+    """
+    
+    name = "postgres"
+    
+    def setup(self, db: Session) -> None:
+        db.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_notes_search ON notes USING GIN ({DOCUMENT_EXPRESSION})"
+        ))
+        db.commit()
+    
+    def index_note(self, db: Session, note: Note) -> None:
+        pass
+    
+    def remove_note(self, db: Session, note_id: int) -> None:
+        pass
+    
+    def rebuild(self, db: Session, chunk_size: int = 500) -> int:
+        # The expression index is derived from the table, so rebuilding means reindexing it
+        db.execute(text("REINDEX INDEX ix_notes_search"))
+        db.commit()
+        return db.query(Note.id).filter(Note.status == ProcessingStatus.COMPLETED).count()
+    
+    def search(self, db: Session, owner_id: int, query: str, limit: int = 20) -> List[Dict]:
+        # Rank and limit first so ts_headline only runs on the returned rows
+        rows = db.execute(text(f"""
+            SELECT id, title, rank,
+                   ts_headline('english', coalesce(structured_text, ''), query, :options) AS snippet
+            FROM (
+                SELECT id, title, structured_text, query,
+                       ts_rank({DOCUMENT_EXPRESSION}, query) AS rank
+                FROM notes, websearch_to_tsquery('english', :query) AS query
+                WHERE owner_id = :owner_id AND {DOCUMENT_EXPRESSION} @@ query
+                ORDER BY rank DESC
+                LIMIT :limit
+            ) AS hits
+            ORDER BY rank DESC
+        """), {
+            "query": query,
+            "owner_id": owner_id,
+            "limit": limit,
+            "options": HEADLINE_OPTIONS,
+        }).all()
+        
+        return [
+            {"id": row.id, "title": row.title, "rank": float(row.rank), "snippet": render_snippet(row.snippet)}
+            for row in rows
+        ]
@@ -0,0 +1,38 @@
+"""Rebuild the full-text search index from the notes table.
+
+Usage (from the backend directory):
+
+    python -m app.search.rebuild [--chunk-size 500]
+"""
+import argparse
+import time
+
+from app.database import SessionLocal, create_tables
+from app.search import get_search_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the note search index.")
+    parser.add_argument("--chunk-size", type=int, default=500, help="notes loaded and committed per batch")
+    args = parser.parse_args()
+    
+    index = get_search_index()
+    if index.name == "memory":
+        print("The memory search backend lives inside each API process and is rebuilt on startup.")
+        return
+    
+    create_tables()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        index.setup(db)
+        total = index.rebuild(db, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    
+    print(f"Re-indexed {total} notes with the {index.name} backend in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from typing import Dict, Iterable, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.note import Note, ProcessingStatus
+from app.search.base import SearchIndex, note_document, render_snippet, tokenize, MATCH_START, MATCH_END
+
+
+def fts_query(query: str) -> str:
+    """Quote each term so user input can never be parsed as FTS5 syntax."""
+    return " ".join(f'"{term}"' for term in tokenize(query))
+
+
+class SQLiteFTSSearchIndex(SearchIndex):
+    """SQLite FTS5 virtual table keyed by note id, ranked with bm25()."""
+    
+    name = "sqlite_fts5"
+    
+    def setup(self, db: Session) -> None:
+        """Create the FTS table, filling it when it is new or empty but notes exist.
+        
+        Otherwise notes stored before the upgrade that added search would
+        never show up in results until someone ran app.search.rebuild.
+        """
+        existed = db.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'"
+        )).first() is not None
+        db.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+            "title, body, owner_id UNINDEXED, tokenize='porter unicode61')"
+        ))
+        db.commit()
+        
+        if existed and db.execute(text("SELECT 1 FROM notes_fts LIMIT 1")).first() is not None:
+            return
+        if db.query(Note.id).filter(Note.status == ProcessingStatus.COMPLETED).first() is not None:
+            self.rebuild(db)
+    
+    def index_note(self, db: Session, note: Note) -> None:
+        title, body = note_document(note)
+        db.execute(text("DELETE FROM notes_fts WHERE rowid = :id"), {"id": note.id})
+        db.execute(
+            text("INSERT INTO notes_fts (rowid, title, body, owner_id) VALUES (:id, :title, :body, :owner_id)"),
+            {"id": note.id, "title": title, "body": body, "owner_id": note.owner_id}
+        )
+    
+    def index_notes(self, db: Session, notes: Iterable[Note]) -> None:
+        params = []
+        for note in notes:
+            title, body = note_document(note)
+            params.append({"id": note.id, "title": title, "body": body, "owner_id": note.owner_id})
+        if not params:
+            return
+        
+        # executemany keeps a bulk import to two statements per batch
+        db.execute(text("DELETE FROM notes_fts WHERE rowid = :id"), [{"id": p["id"]} for p in params])
+        db.execute(
+            text("INSERT INTO notes_fts (rowid, title, body, owner_id) VALUES (:id, :title, :body, :owner_id)"),
+            params
+        )
+    
+    def remove_note(self, db: Session, note_id: int) -> None:
+        db.execute(text("DELETE FROM notes_fts WHERE rowid = :id"), {"id": note_id})
+    
+    def clear(self, db: Session) -> None:
+        db.execute(text("DELETE FROM notes_fts"))
+    
+    def search(self, db: Session, owner_id: int, query: str, limit: int = 20) -> List[Dict]:
+        match = fts_query(query)
+        if not match:
+            return []
+        
+        rows = db.execute(text("""
+            SELECT rowid AS id, title, bm25(notes_fts) AS score,
+                   snippet(notes_fts, 1, :start, :end, '…', 16) AS snippet
+            FROM notes_fts
+            WHERE notes_fts MATCH :match AND owner_id = :owner_id
+            ORDER BY score
+            LIMIT :limit
+        """), {
+            "match": match,
+            "owner_id": owner_id,
+            "limit": limit,
+            "start": MATCH_START,
+            "end": MATCH_END,
+        }).all()
+        
+        # bm25() is lower-is-better; flip it so every backend ranks higher-is-better
+        return [
+            {"id": row.id, "title": row.title, "rank": -float(row.score), "snippet": render_snippet(row.snippet)}
+            for row in rows
+        ]
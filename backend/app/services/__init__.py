@@ -0,0 +1 @@
+from app.services.ocr_jobs import ocr_queue
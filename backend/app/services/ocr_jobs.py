@@ -0,0 +1,221 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import or_
+
+from app.categorize import get_categorizer
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.note import Note, ProcessingStatus
+from app.search import get_search_index
+from app.services.previews import create_note_previews
+from app.storage import get_blob_store
+
+from instrumentation import registry, stage
+from ocr_service import extract_document
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def build_raw_text(ocr_result: Dict[str, Any]) -> str:
+    """Flatten a structured OCR result into plain text."""
+    text_parts = []
+    
+    # Add headers
+    if ocr_result.get('headers'):
+        text_parts.extend(ocr_result['headers'])
+    
+    # Add paragraphs
+    if ocr_result.get('paragraphs'):
+        text_parts.extend(ocr_result['paragraphs'])
+    
+    # Add bullet points
+    if ocr_result.get('bullet_points'):
+        text_parts.extend(ocr_result['bullet_points'])
+    
+    # Add key-values (now it's a list or dict)
+    key_values = ocr_result.get('key_values', {})
+    if isinstance(key_values, dict):
+        for k, v in key_values.items():
+            text_parts.append(f"{k}: {v}")
+    elif isinstance(key_values, list):
+        text_parts.extend([str(kv) for kv in key_values])
+    
+    # Add tables
+    if ocr_result.get('tables'):
+        for table in ocr_result['tables']:
+            if isinstance(table, list):
+                for row in table:
+                    if isinstance(row, list):
+                        text_parts.append(' | '.join(row))
+                    else:
+                        text_parts.append(str(row))
+    
+    # Add section lines not already covered above (titles are in headers)
+    if ocr_result.get('sections'):
+        for section in ocr_result['sections']:
+            for item in section.get('content', []):
+                if isinstance(item, dict) and item.get('type') == 'other' and item.get('text'):
+                    text_parts.append(item['text'])
+    
+    raw_text = '\n'.join(text_parts) if text_parts else ''
+    
+    if not raw_text and ocr_result.get('raw_text'):
+        raw_text = ocr_result['raw_text']
+    
+    return raw_text
+
+
+def process_note(note_id: int) -> None:
+    """Run OCR for a pending note and store the result."""
+    db = SessionLocal()
+    try:
+        # Claim the note so a duplicate submission cannot process it twice. Notes from
+        # before the blob store stay PENDING until app.storage.backfill gives them a key
+        claimed = db.query(Note).filter(
+            Note.id == note_id,
+            Note.status == ProcessingStatus.PENDING,
+            Note.image_key.is_not(None)
+        ).update(
+            {Note.status: ProcessingStatus.PROCESSING, Note.claimed_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        
+        if not claimed:
+            return
+        
+        note = db.query(Note).filter(Note.id == note_id).first()
+        
+        try:
+            image_bytes = get_blob_store().get(note.image_key)
+            
+            # Previews are best effort; a failure here should not fail OCR
+            if not note.thumbnail_key:
+                try:
+                    with stage("previews", note_id=note_id):
+                        preview_keys = create_note_previews(image_bytes)
+                    note.thumbnail_key = preview_keys["thumbnail"]
+                    note.preview_key = preview_keys["preview"]
+                    db.commit()
+                except Exception:
+                    logger.warning("Preview generation failed", exc_info=True, extra={"note_id": note_id})
+                    db.rollback()
+            
+            with stage("document", note_id=note_id, bytes=len(image_bytes)):
+                ocr_result = extract_document(image_bytes)
+            raw_text = build_raw_text(ocr_result)
+            
+            note.raw_text = raw_text
+            note.structured_text = raw_text
+            note.status = ProcessingStatus.COMPLETED
+            note.processed_at = datetime.utcnow()
+            note.error_message = None
+            
+            # Categorization is best effort too, and never replaces a manual choice
+            if settings.categorize_notes and note.subject is None:
+                try:
+                    with stage("categorize", note_id=note_id):
+                        category = get_categorizer().categorize(raw_text)
+                    if category is not None:
+                        note.subject = category.subject
+                        if note.topic is None:
+                            note.topic = category.topic
+                except Exception:
+                    logger.warning("Categorization failed", exc_info=True, extra={"note_id": note_id})
+            
+            get_search_index().index_note(db, note)
+        except Exception as e:
+            logger.exception("OCR failed", extra={"note_id": note_id})
+            note.status = ProcessingStatus.FAILED
+            note.error_message = str(e)
+        
+        with stage("db_write", note_id=note_id):
+            db.commit()
+    finally:
+        db.close()
+
+
+class OCRJobQueue:
+    """In-process worker pool that moves notes from PENDING to COMPLETED/FAILED."""
+    
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._depth = 0
+    
+    @property
+    def depth(self) -> int:
+        """Number of submitted jobs that have not finished yet."""
+        return self._depth
+    
+    def start(self) -> None:
+        """Start the worker pool if it is not running."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="ocr-worker"
+                )
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool, optionally waiting for queued jobs."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+    
+    def submit(self, note_id: int) -> None:
+        """Queue a note for OCR processing."""
+        self.start()
+        with self._lock:
+            self._depth += 1
+        self._executor.submit(self._run, note_id)
+    
+    def requeue_unfinished(self) -> int:
+        """Re-submit notes left PENDING, or PROCESSING by a process that died.
+        
+        Other processes may be running OCR right now, so only claims older
+        than ocr_claim_timeout are taken back. Re-submitting a PENDING note
+        is safe: whichever process claims it first does the work. Notes with
+        no image_key yet (see app.storage.backfill) are left for a later start.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.ocr_claim_timeout)
+        db = SessionLocal()
+        try:
+            db.query(Note).filter(
+                Note.status == ProcessingStatus.PROCESSING,
+                or_(Note.claimed_at.is_(None), Note.claimed_at < stale_before)
+            ).update({Note.status: ProcessingStatus.PENDING}, synchronize_session=False)
+            db.commit()
+            
+            note_ids = [
+                row.id for row in db.query(Note.id).filter(
+                    Note.status == ProcessingStatus.PENDING,
+                    Note.image_key.is_not(None)
+                ).order_by(Note.id).all()
+            ]
+        finally:
+            db.close()
+        
+        for note_id in note_ids:
+            self.submit(note_id)
+        
+        return len(note_ids)
+    
+    def _run(self, note_id: int) -> None:
+        try:
+            process_note(note_id)
+        finally:
+            with self._lock:
+                self._depth -= 1
+
+
+ocr_queue = OCRJobQueue(settings.ocr_worker_count)
+
+registry.callback("ocr_queue_depth", "OCR jobs queued or running in this process.", "gauge", lambda: ocr_queue.depth)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+import bcrypt
+
+from instrumentation import registry
+
+T = TypeVar("T")
+
+HASH_REJECTED = registry.counter(
+    "password_hash_rejected_total", "Password hash/verify calls refused because the hashing queue was full."
+)
+
+
+class HasherBusyError(Exception):
+    """Too many password hashes are already queued; the caller should retry later."""
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """The cost factor of a bcrypt hash ($2b$<rounds>$...), or None if it is not one."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so the pool uses up to max_workers cores
+    without tying up the event loop or the request threadpool. At most
+    max_pending calls are queued or running; past that, calls fail fast
+    with HasherBusyError rather than adding seconds of queueing to every
+    login in a burst.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 0, max_pending: int = 0):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.rounds = rounds
+        self.max_workers = 0
+        self.max_pending = 0
+        self.configure(rounds, max_workers, max_pending)
+
+    def configure(self, rounds: Optional[int] = None, max_workers: int = 0, max_pending: int = 0) -> None:
+        """Set the cost factor and pool size.
+
+        max_workers 0 means one thread per core; max_pending 0 means eight
+        calls per worker. The threads start on first use.
+        """
+        self.shutdown()
+        with self._lock:
+            if rounds is not None:
+                self.rounds = rounds
+            self.max_workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+            self.max_pending = max_pending if max_pending > 0 else self.max_workers * 8
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        # backpressure: refuse instead of queueing without bound
+        with self._lock:
+            if self._pending >= self.max_pending:
+                HASH_REJECTED.inc()
+                raise HasherBusyError("Password hashing queue is full")
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # released when the thread is done with it, not when the caller stops waiting:
+        # a cancelled request leaves bcrypt running unless it had not started yet
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def hash_sync(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    @staticmethod
+    def verify_sync(password: str, hashed: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hash_sync, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.verify_sync, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """Whether a stored hash was made with a different cost than the configured one."""
+        return hash_rounds(hashed) != self.rounds
+
+
+password_hasher = PasswordHasher()
+
+registry.callback(
+    "password_hash_pending", "Password hash/verify calls queued or running.", "gauge",
+    lambda: password_hasher.pending
+)
@@ -0,0 +1,38 @@
+from typing import Dict
+
+from app.config import get_settings
+from app.storage import get_blob_store
+
+settings = get_settings()
+
+PREVIEW_MIMETYPES = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+
+def create_note_previews(image_bytes: bytes) -> Dict[str, str]:
+    """Generate the thumbnail and medium preview and store them as blobs.
+    
+    Returns the blob keys as {"thumbnail": key, "preview": key}.
+    """
+    # opencv loads on the first preview instead of at startup
+    from image_preprocessing import generate_previews
+
+    previews = generate_previews(
+        image_bytes,
+        {
+            "thumbnail": settings.thumbnail_max_size,
+            "preview": settings.preview_max_size,
+        },
+        fmt=settings.preview_format,
+        quality=settings.preview_quality
+    )
+    
+    store = get_blob_store()
+    return {name: store.put(data) for name, data in previews.items()}
+
+
+def preview_mimetype() -> str:
+    """Content type of the configured preview format."""
+    return PREVIEW_MIMETYPES[settings.preview_format]
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models.user import User
+from instrumentation import registry
+
+# User columns kept in the cache (never the password hash)
+CACHED_COLUMNS = ("id", "email", "username", "is_active", "created_at", "updated_at")
+
+
+class ExpiringLRU:
+    """Thread-safe LRU mapping whose entries also expire at a given time."""
+
+    def __init__(self, max_entries: int):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def resize(self, max_entries: int) -> None:
+        with self._lock:
+            self.max_entries = max_entries
+            while len(self._entries) > max(max_entries, 0):
+                self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, expires_at: float) -> None:
+        if self.max_entries <= 0 or expires_at <= time.monotonic():
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class UserCache:
+    """Per-process cache of active users by id, so auth skips the users query.
+
+    Entries live at most `ttl` seconds, which bounds how stale a user can be
+    when it was changed by another process. Changes flushed through the ORM
+    in this process invalidate the entry right away. Hits return a fresh
+    transient User, never an instance shared between requests.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 60.0):
+        self._entries = ExpiringLRU(max_entries)
+        self.ttl = ttl
+
+    def configure(self, max_entries: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        if ttl is not None:
+            self.ttl = ttl
+            self._entries.clear()
+        if max_entries is not None:
+            self._entries.resize(max_entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self._entries.max_entries > 0
+
+    def get(self, user_id: int) -> Optional[User]:
+        if not self.enabled:
+            return None
+        columns = self._entries.get(user_id)
+        return User(**columns) if columns is not None else None
+
+    def put(self, user: User) -> None:
+        """Remember an active user (inactive ones always go back to the database)."""
+        if not self.enabled or not user.is_active:
+            return
+        columns = {name: getattr(user, name) for name in CACHED_COLUMNS}
+        self._entries.put(user.id, columns, time.monotonic() + self.ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+
+class TokenCache:
+    """Remembers the user id of access tokens that already passed verification.
+
+    A token is kept until its own `exp`, so an expired token is never
+    accepted from the cache.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self._entries = ExpiringLRU(max_entries)
+
+    def configure(self, max_entries: Optional[int] = None) -> None:
+        if max_entries is not None:
+            self._entries.resize(max_entries)
+
+    def get(self, token: str) -> Optional[int]:
+        return self._entries.get(token)
+
+    def put(self, token: str, user_id: int, expires: Optional[float]) -> None:
+        # tokens without an exp claim are verified every time
+        if expires is None:
+            return
+        self._entries.put(token, user_id, time.monotonic() + (expires - time.time()))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+
+user_cache = UserCache()
+token_cache = TokenCache()
+
+
+# Drop a user when a flush changes or deletes it, and again once the transaction
+# commits, in case a concurrent request cached the old row in between
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("changed_user_ids", None)
+
+
+registry.callback(
+    "auth_user_cache_lookups_total", "Authenticated-user cache lookups by outcome.", "counter",
+    lambda: {("hit",): user_cache.stats()["hits"], ("miss",): user_cache.stats()["misses"]},
+    ("result",)
+)
+registry.callback(
+    "auth_token_cache_lookups_total", "Verified-token cache lookups by outcome.", "counter",
+    lambda: {("hit",): token_cache.stats()["hits"], ("miss",): token_cache.stats()["misses"]},
+    ("result",)
+)
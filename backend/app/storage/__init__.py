@@ -0,0 +1,16 @@
+from functools import lru_cache
+
+from app.config import get_settings
+from app.storage.base import BlobStore, BlobNotFoundError
+from app.storage.local import LocalBlobStore
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    """Return the process-wide blob store configured in Settings."""
+    settings = get_settings()
+    
+    if settings.blob_store_backend == "local":
+        return LocalBlobStore(settings.blob_store_path)
+    
+    raise ValueError(f"Unknown blob store backend: {settings.blob_store_backend}")
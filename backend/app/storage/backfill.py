@@ -0,0 +1,143 @@
+"""Move note images stored in the database into the blob store.
+
+Usage (from the backend directory):
+
+    python -m app.storage.backfill [--chunk-size 50] [--no-previews] [--keep-column]
+
+Databases created before the blob store keep every image inline in
+notes.original_image. create_tables() adds the new columns on startup;
+this copies each image into the blob store, fills in image_key and
+image_size, and drops original_image once every note has been moved
+(SQLite databases get this step automatically on startup). It then
+generates the thumbnail and preview of notes that have none, unless
+--no-previews. Notes still waiting for OCR are only processed once they
+have an image_key, so they are picked up the next time the API starts.
+"""
+import argparse
+import logging
+import time
+from typing import NamedTuple
+
+from sqlalchemy import func, inspect, select, text, update
+
+from app.database import SessionLocal, create_tables, engine
+from app.models.note import Note
+from app.services.previews import create_note_previews
+from app.storage import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+LEGACY_COLUMN = "original_image"
+
+
+class BackfillResult(NamedTuple):
+    moved: int
+    unmoved: int
+    dropped_column: bool
+
+
+def has_inline_images() -> bool:
+    """Whether the notes table still has the inline image column."""
+    return LEGACY_COLUMN in {column["name"] for column in inspect(engine).get_columns(Note.__tablename__)}
+
+
+def move_inline_images(chunk_size: int = 50, drop_column: bool = True) -> BackfillResult:
+    """Copy notes.original_image into the blob store, then drop the column if nothing is left."""
+    store = get_blob_store()
+    moved = 0
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = db.execute(text(
+                f"SELECT id, {LEGACY_COLUMN} AS image FROM notes "
+                f"WHERE id > :last_id AND image_key IS NULL AND {LEGACY_COLUMN} IS NOT NULL "
+                "ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": chunk_size}).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            changes = [
+                {"id": row.id, "image_key": store.put(bytes(row.image)), "image_size": len(row.image)}
+                for row in rows
+            ]
+            db.execute(update(Note), changes)
+            db.commit()
+            moved += len(changes)
+
+        unmoved = db.scalar(select(func.count()).select_from(Note).where(Note.image_key.is_(None)))
+    finally:
+        db.close()
+
+    dropped = drop_column and not unmoved
+    if dropped:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE notes DROP COLUMN {LEGACY_COLUMN}"))
+    return BackfillResult(moved, unmoved, dropped)
+
+
+def create_missing_previews(chunk_size: int = 50) -> int:
+    """Generate the thumbnail and preview of notes whose image has none."""
+    store = get_blob_store()
+    created = 0
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(Note.id, Note.image_key).where(
+                    Note.id > last_id,
+                    Note.image_key.is_not(None),
+                    Note.thumbnail_key.is_(None),
+                ).order_by(Note.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            changes = []
+            for row in rows:
+                # previews are best effort, as they are after an upload
+                try:
+                    keys = create_note_previews(store.get(row.image_key))
+                except Exception:
+                    logger.warning("Preview generation failed", exc_info=True, extra={"note_id": row.id})
+                    continue
+                changes.append({"id": row.id, "thumbnail_key": keys["thumbnail"], "preview_key": keys["preview"]})
+
+            if changes:
+                db.execute(update(Note), changes)
+                db.commit()
+            created += len(changes)
+    finally:
+        db.close()
+    return created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move inline note images into the blob store.")
+    parser.add_argument("--chunk-size", type=int, default=50, help="notes loaded and committed per batch")
+    parser.add_argument("--no-previews", action="store_true", help="do not generate missing thumbnails/previews")
+    parser.add_argument("--keep-column", action="store_true", help=f"keep notes.{LEGACY_COLUMN} afterwards")
+    args = parser.parse_args()
+
+    create_tables()
+    started = time.perf_counter()
+    if has_inline_images():
+        result = move_inline_images(args.chunk_size, drop_column=not args.keep_column)
+        print(f"Moved {result.moved} images into the blob store")
+        if result.unmoved:
+            print(f"{result.unmoved} notes have no image in either place; kept notes.{LEGACY_COLUMN}.")
+        elif result.dropped_column:
+            print(f"Dropped notes.{LEGACY_COLUMN}.")
+    else:
+        print(f"notes.{LEGACY_COLUMN} does not exist; no images to move.")
+
+    if not args.no_previews:
+        print(f"Created previews for {create_missing_previews(args.chunk_size)} notes")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
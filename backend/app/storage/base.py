@@ -0,0 +1,64 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator, Tuple
+
+
+class BlobNotFoundError(KeyError):
+    """Raised when a blob key does not exist in the store."""
+
+
+class BlobStore(ABC):
+    """Interface for storing note images outside the database."""
+    
+    chunk_size: int = 64 * 1024
+    
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Store bytes and return the key they can be read back with."""
+    
+    def put_file(self, fileobj: BinaryIO) -> Tuple[str, int]:
+        """Store the contents of a file object; returns (key, size)."""
+        data = fileobj.read()
+        return self.put(data), len(data)
+    
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Open a blob for binary reading."""
+    
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """Size of a blob in bytes."""
+    
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether a blob is present."""
+    
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a blob; missing keys are ignored."""
+    
+    @abstractmethod
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        """Yield (key, last write time) for every blob.
+        
+        Storing content that is already present counts as a write, so a
+        blob an upload is about to reference always looks recent.
+        """
+    
+    def get(self, key: str) -> bytes:
+        """Read a whole blob into memory."""
+        with self.open(key) as f:
+            return f.read()
+    
+    def iter_range(self, key: str, start: int = 0, end: int = None) -> Iterator[bytes]:
+        """Yield the bytes in [start, end] (inclusive) in chunks."""
+        with self.open(key) as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                to_read = self.chunk_size if remaining is None else min(self.chunk_size, remaining)
+                chunk = f.read(to_read)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
@@ -0,0 +1,80 @@
+"""Delete blobs that no note references any more.
+
+Usage (from the backend directory):
+
+    python -m app.storage.gc [--grace-seconds 3600] [--dry-run]
+
+Blobs are content-addressed and shared between notes, so deleting a note
+leaves its image, thumbnail and preview in the store: an upload of the
+same bytes may be about to reference them again. This removes blobs that
+no note's image_key, thumbnail_key or preview_key points at and that have
+not been written for the grace period, which must comfortably exceed the
+time between storing an upload and committing its note.
+"""
+import argparse
+import time
+from typing import NamedTuple, Set
+
+from sqlalchemy import select
+
+from app.database import SessionLocal, create_tables
+from app.models.note import Note
+from app.storage import get_blob_store
+
+BLOB_COLUMNS = (Note.image_key, Note.thumbnail_key, Note.preview_key)
+
+
+class CollectResult(NamedTuple):
+    scanned: int
+    deleted: int
+
+
+def referenced_keys(chunk_size: int = 1000) -> Set[str]:
+    """Every blob key some note points at."""
+    keys = set()
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(*BLOB_COLUMNS).execution_options(yield_per=chunk_size))
+        for row in rows:
+            keys.update(key for key in row if key)
+    finally:
+        db.close()
+    return keys
+
+
+def collect_garbage(grace_seconds: float = 3600, dry_run: bool = False) -> CollectResult:
+    """Delete unreferenced blobs last written more than grace_seconds ago."""
+    store = get_blob_store()
+    # read the cutoff first: anything written after it, including blobs an
+    # upload reuses while the references load, is kept
+    cutoff = time.time() - grace_seconds
+    keys = referenced_keys()
+
+    scanned = deleted = 0
+    for key, written_at in store.iter_blobs():
+        scanned += 1
+        if key in keys or written_at > cutoff:
+            continue
+        if not dry_run:
+            store.delete(key)
+        deleted += 1
+    return CollectResult(scanned, deleted)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete blobs that no note references.")
+    parser.add_argument("--grace-seconds", type=float, default=3600,
+                        help="keep unreferenced blobs written more recently than this")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be deleted")
+    args = parser.parse_args()
+
+    create_tables()
+    started = time.perf_counter()
+    result = collect_garbage(args.grace_seconds, dry_run=args.dry_run)
+    verb = "Would delete" if args.dry_run else "Deleted"
+    print(f"{verb} {result.deleted} of {result.scanned} blobs")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
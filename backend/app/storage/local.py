@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Iterator, Tuple
+
+from app.storage.base import BlobStore, BlobNotFoundError
+
+
+class LocalBlobStore(BlobStore):
+    """Content-addressed blob store on the local filesystem.
+    
+    Blobs are keyed by the SHA-256 of their content and fanned out into
+    two levels of subdirectories, so identical uploads share one file.
+    """
+    
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+    
+    def _path(self, key: str) -> str:
+        if len(key) < 5 or not all(c in "0123456789abcdef" for c in key):
+            raise BlobNotFoundError(key)
+        return os.path.join(self.root, key[:2], key[2:4], key)
+    
+    def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        path = self._path(key)
+        
+        if self._touch(path):
+            return key
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # Write to a temp file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        
+        return key
+    
+    def put_file(self, fileobj: BinaryIO) -> Tuple[str, int]:
+        # Copy in chunks while hashing, so the upload is never fully in memory
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: fileobj.read(self.chunk_size), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            
+            key = digest.hexdigest()
+            path = self._path(key)
+            if self._touch(path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        
+        return key, size
+    
+    @staticmethod
+    def _touch(path: str) -> bool:
+        # refresh an existing blob's mtime so garbage collection sees it as in use
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise BlobNotFoundError(key)
+    
+    def size(self, key: str) -> int:
+        try:
+            return os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            raise BlobNotFoundError(key)
+    
+    def exists(self, key: str) -> bool:
+        try:
+            return os.path.exists(self._path(key))
+        except BlobNotFoundError:
+            return False
+    
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except (FileNotFoundError, BlobNotFoundError):
+            pass
+    
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                # skip in-progress writes (.tmp-*) and anything else that is not a key
+                if name.startswith("."):
+                    continue
+                try:
+                    yield name, os.stat(os.path.join(directory, name)).st_mtime
+                except FileNotFoundError:
+                    continue
@@ -0,0 +1 @@
+# Benchmarks for the NotePeel backend (run from the backend directory)
@@ -0,0 +1,209 @@
+"""End-to-end API latency against a throwaway SQLite database, fully offline.
+
+Usage (from the backend directory; needs httpx for FastAPI's TestClient):
+
+    python -m benchmarks.bench_api [--uploads 20] [--notes 100 1000 10000 50000] [--requests 50] [--json]
+
+Uploads are synthetic note images whose OCR responses were recorded up
+front, so the replay provider serves them without network access.
+Measures upload-to-completed latency (one at a time, then as a burst),
+and list/detail latency as the number of stored notes grows: the first
+page, and the last page reached by offset (`skip`) and by cursor.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import List
+
+from benchmarks.common import emit, peak_rss_mb, sample, summarize
+from benchmarks.fixtures import note_image, record_responses, synthetic_response
+
+
+def _configure_environment(workdir: str) -> None:
+    # must run before anything under app/ is imported, since Settings are read once
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "BLOB_STORE_PATH": os.path.join(workdir, "blobs"),
+        "OCR_PROVIDER": "replay",
+        "OCR_REPLAY_DIR": os.path.join(workdir, "responses"),
+        "OCR_CACHE_PATH": "",
+        "PREPROCESS_WORKERS": "0",
+        "LOG_LEVEL": "WARNING",
+        "DATABASE_ECHO": "false",
+    })
+
+
+def _wait_completed(client, headers, note_ids: List[int], timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    pending = set(note_ids)
+    while pending:
+        for note_id in list(pending):
+            status = client.get(f"/api/notes/{note_id}/status", headers=headers).json()["status"]
+            if status == "failed":
+                raise RuntimeError(f"OCR failed for note {note_id}")
+            if status == "completed":
+                pending.discard(note_id)
+        if pending:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"{len(pending)} notes did not finish OCR")
+            time.sleep(0.005)
+
+
+def _seed_notes(user_id: int, image_key: str, count: int) -> None:
+    from app.database import SessionLocal
+    from app.models.note import Note, ProcessingStatus
+
+    db = SessionLocal()
+    try:
+        db.add_all([
+            Note(
+                title=f"Seeded note {index}",
+                image_key=image_key,
+                image_filename=f"seed-{index}.png",
+                image_mimetype="image/png",
+                raw_text="Chapter 1\nThe mitochondria is the powerhouse of the cell",
+                structured_text="Chapter 1\nThe mitochondria is the powerhouse of the cell",
+                status=ProcessingStatus.COMPLETED,
+                owner_id=user_id,
+            )
+            for index in range(count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+#cursor of the note just before the last page_size notes (oldest first is the end of the list)
+def _deep_cursor(user_id: int, page_size: int) -> str:
+    from sqlalchemy import select
+    from app.controllers.note_controller import encode_cursor
+    from app.database import SessionLocal
+    from app.models.note import Note
+
+    db = SessionLocal()
+    try:
+        note = db.scalars(
+            select(Note).where(Note.owner_id == user_id)
+            .order_by(Note.created_at.asc(), Note.id.asc()).offset(page_size).limit(1)
+        ).first()
+        return encode_cursor(note)
+    finally:
+        db.close()
+
+
+def run(uploads: int = 20, note_counts: List[int] = (100, 1000, 10000, 50000), requests: int = 50) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        _configure_environment(workdir)
+
+        images = [note_image(seed, width=800, height=1100) for seed in range(uploads * 2)]
+        record_responses(
+            os.environ["OCR_REPLAY_DIR"],
+            [(image, synthetic_response(40, seed=seed)) for seed, image in enumerate(images)]
+        )
+
+        from fastapi.testclient import TestClient
+        import main
+
+        result = {}
+        with TestClient(main.app) as client:
+            client.post("/api/auth/register", json={"email": "bench@example.com", "username": "bench", "password": "bench-pw"})
+            token = client.post("/api/auth/login", json={"email": "bench@example.com", "password": "bench-pw"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+
+            # one upload at a time: request latency and time until OCR completed
+            request_timings = []
+            completed_timings = []
+            note_ids = []
+            for index, image in enumerate(images[:uploads]):
+                started = time.perf_counter()
+                response = client.post("/api/notes/upload", files={"file": (f"note-{index}.png", image, "image/png")}, headers=headers)
+                request_timings.append(time.perf_counter() - started)
+                note_id = response.json()["id"]
+                _wait_completed(client, headers, [note_id])
+                completed_timings.append(time.perf_counter() - started)
+                note_ids.append(note_id)
+
+            result["upload_request"] = summarize(request_timings)
+            result["upload_to_completed"] = summarize(completed_timings)
+
+            # a burst: submit everything, then wait for the queue to drain
+            started = time.perf_counter()
+            burst_ids = [
+                client.post("/api/notes/upload", files={"file": (f"burst-{index}.png", image, "image/png")}, headers=headers).json()["id"]
+                for index, image in enumerate(images[uploads:])
+            ]
+            _wait_completed(client, headers, burst_ids)
+            elapsed = time.perf_counter() - started
+            result["upload_burst"] = {"notes": len(burst_ids), "seconds": elapsed, "notes_per_second": len(burst_ids) / elapsed}
+
+            # list/detail latency as the table grows
+            from sqlalchemy import select
+            from app.database import SessionLocal
+            from app.models.note import Note
+            db = SessionLocal()
+            image_key = db.get(Note, note_ids[0]).image_key
+            db.close()
+
+            rng = random.Random(7)
+            stored = len(note_ids) + len(burst_ids)
+            page_size = 50
+            scaling = {}
+            for count in note_counts:
+                if count > stored:
+                    _seed_notes(user_id, image_key, count - stored)
+                    stored = count
+                db = SessionLocal()
+                all_ids = db.scalars(select(Note.id).where(Note.owner_id == user_id)).all()
+                db.close()
+                deep_skip = max(0, stored - page_size)
+                deep_cursor = _deep_cursor(user_id, page_size) if stored > page_size else None
+                scaling[str(stored)] = {
+                    "list": summarize(sample(requests, lambda: client.get(f"/api/notes/?limit={page_size}", headers=headers))),
+                    "list_last_page_offset": summarize(sample(requests, lambda: client.get(
+                        f"/api/notes/?limit={page_size}&skip={deep_skip}", headers=headers))),
+                    "list_last_page_cursor": summarize(sample(requests, lambda: client.get(
+                        "/api/notes/", params={"limit": page_size, "cursor": deep_cursor}, headers=headers))),
+                    "detail": summarize(sample(requests, lambda: client.get(f"/api/notes/{rng.choice(all_ids)}", headers=headers))),
+                    "status": summarize(sample(requests, lambda: client.get(f"/api/notes/{rng.choice(all_ids)}/status", headers=headers))),
+                }
+            result["notes"] = scaling
+
+        result["peak_rss_mb"] = peak_rss_mb()
+        return result
+
+
+def _print(result: dict) -> None:
+    for name in ("upload_request", "upload_to_completed"):
+        timing = result[name]
+        print(f"{name:<20} p50 {timing['p50_seconds'] * 1000:8.2f} ms  p95 {timing['p95_seconds'] * 1000:8.2f} ms")
+    burst = result["upload_burst"]
+    print(f"{'upload_burst':<20} {burst['notes']} notes in {burst['seconds']:.2f}s ({burst['notes_per_second']:.1f}/s)")
+    for count, timings in result["notes"].items():
+        print(
+            f"{count:>6} notes  list p50 {timings['list']['p50_seconds'] * 1000:7.2f} ms  "
+            f"last page p50/p99 offset {timings['list_last_page_offset']['p50_seconds'] * 1000:7.2f}/"
+            f"{timings['list_last_page_offset']['p99_seconds'] * 1000:7.2f} ms  "
+            f"cursor {timings['list_last_page_cursor']['p50_seconds'] * 1000:7.2f}/"
+            f"{timings['list_last_page_cursor']['p99_seconds'] * 1000:7.2f} ms  "
+            f"detail p50 {timings['detail']['p50_seconds'] * 1000:7.2f} ms  "
+            f"status p50 {timings['status']['p50_seconds'] * 1000:7.2f} ms"
+        )
+    print(f"peak rss {result['peak_rss_mb']:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--notes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    emit(run(args.uploads, args.notes, args.requests), args.json, _print)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Password hashing throughput and login bursts, fully offline.
+
+Usage (from the backend directory; needs httpx for the in-process client):
+
+    python -m benchmarks.bench_auth [--rounds 10 12] [--logins 64] [--api-rounds 10] [--json]
+
+`hasher` verifies a burst of passwords through PasswordHasher at each
+bcrypt cost and reports logins/sec, overall and per core. `api` sends a
+burst of concurrent POST /api/auth/login requests against a throwaway
+SQLite database and reports throughput, latency and how many were
+refused with 503 by the hashing queue.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+
+from benchmarks.bench_api import _configure_environment
+from benchmarks.common import emit, peak_rss_mb, summarize
+
+
+def _cores() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+
+async def _hasher_burst(rounds: int, logins: int) -> dict:
+    from app.services.password_hasher import PasswordHasher
+
+    hasher = PasswordHasher(rounds=rounds, max_pending=logins)
+    hashed = hasher.hash_sync("bench-pw")
+    started = time.perf_counter()
+    await asyncio.gather(*[hasher.verify("bench-pw", hashed) for _ in range(logins)])
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    return {
+        "workers": hasher.max_workers,
+        "seconds": elapsed,
+        "logins_per_second": logins / elapsed,
+        "logins_per_second_per_core": logins / elapsed / min(hasher.max_workers, _cores()),
+    }
+
+
+async def _api_burst(logins: int) -> dict:
+    import httpx
+    import main
+
+    main.startup_event()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            credentials = {"email": "bench@example.com", "password": "bench-pw"}
+            await client.post("/api/auth/register", json={**credentials, "username": "bench"})
+
+            async def login():
+                started = time.perf_counter()
+                response = await client.post("/api/auth/login", json=credentials)
+                return response.status_code, time.perf_counter() - started
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*[login() for _ in range(logins)])
+            elapsed = time.perf_counter() - started
+    finally:
+        main.shutdown_event()
+        await main.close_database()
+
+    accepted = [seconds for code, seconds in results if code == 200]
+    return {
+        "logins": logins,
+        "accepted": len(accepted),
+        "rejected": sum(1 for code, _ in results if code == 503),
+        "seconds": elapsed,
+        "logins_per_second": len(accepted) / elapsed,
+        "latency": summarize(accepted) if accepted else {},
+    }
+
+
+def run(rounds: List[int] = (10, 12), logins: int = 64, api_rounds: int = 10) -> dict:
+    result = {"cores": _cores(), "hasher": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        # before the first app import, since Settings are read once
+        _configure_environment(workdir)
+        os.environ["BCRYPT_ROUNDS"] = str(api_rounds)
+
+        for cost in rounds:
+            result["hasher"][str(cost)] = asyncio.run(_hasher_burst(cost, logins))
+        result["api"] = {"rounds": api_rounds, **asyncio.run(_api_burst(logins))}
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _print(result: dict) -> None:
+    print(f"{result['cores']} cores")
+    for cost, timing in result["hasher"].items():
+        print(
+            f"hasher  cost {cost:>2}  {timing['logins_per_second']:7.1f} logins/s  "
+            f"({timing['logins_per_second_per_core']:.1f}/s per core, {timing['workers']} threads)"
+        )
+    api = result["api"]
+    latency = api["latency"]
+    print(
+        f"api     cost {api['rounds']:>2}  {api['logins_per_second']:7.1f} logins/s  "
+        f"accepted {api['accepted']}/{api['logins']}  rejected {api['rejected']}  "
+        f"p50 {latency.get('p50_seconds', 0) * 1000:.0f} ms  p95 {latency.get('p95_seconds', 0) * 1000:.0f} ms"
+    )
+    print(f"peak rss {result['peak_rss_mb']:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--api-rounds", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    emit(run(args.rounds, args.logins, args.api_rounds), args.json, _print)
+
+
+if __name__ == "__main__":
+    main()
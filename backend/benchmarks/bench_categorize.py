@@ -0,0 +1,81 @@
+"""Subject/topic categorization throughput, fully offline.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_categorize [--notes 1000 10000] [--sentences 8] [--repeat 3] [--json]
+
+Trains the categorizer on the bundled seed corpus into a temporary
+directory, loads it back memory-mapped, and classifies synthetic notes
+(random seed-corpus sentences joined together) both as one batch and
+one note at a time, reporting notes/sec for each.
+"""
+import argparse
+import random
+import tempfile
+import time
+from typing import List
+
+from benchmarks.bench_api import _configure_environment
+from benchmarks.common import best_of, emit, peak_rss_mb
+
+
+def synthetic_notes(corpus: list, count: int, sentences: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(corpus)[2] for _ in range(sentences)) for _ in range(count)]
+
+
+def run(note_counts: List[int], sentences: int = 8, repeat: int = 3) -> dict:
+    result = {"note_counts": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        # before the first app import, since Settings are read once
+        _configure_environment(workdir)
+        from app.categorize.model import Categorizer, load_corpus
+
+        corpus = load_corpus()
+        started = time.perf_counter()
+        Categorizer.train(corpus).save(workdir)
+        result["train_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        categorizer = Categorizer.load(workdir)
+        result["load_seconds"] = time.perf_counter() - started
+
+        for count in note_counts:
+            notes = synthetic_notes(corpus, count, sentences)
+            batch = best_of(repeat, lambda: categorizer.categorize_batch(notes))
+            single_notes = notes[:min(count, 500)]
+            single = best_of(repeat, lambda: [categorizer.categorize(note) for note in single_notes])
+            result["note_counts"][str(count)] = {
+                "batch_seconds": batch,
+                "batch_notes_per_second": count / batch,
+                "single_notes_per_second": len(single_notes) / single,
+            }
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _print(result: dict) -> None:
+    print(f"train {result['train_seconds'] * 1000:.0f} ms  load {result['load_seconds'] * 1000:.1f} ms")
+    for count, timing in result["note_counts"].items():
+        print(
+            f"{count:>6} notes  batch {timing['batch_seconds'] * 1000:8.1f} ms "
+            f"({timing['batch_notes_per_second']:.0f} notes/s)  "
+            f"one at a time {timing['single_notes_per_second']:.0f} notes/s"
+        )
+    print(f"peak rss {result['peak_rss_mb']:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--sentences", type=int, default=8, help="seed sentences per synthetic note")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    emit(run(args.notes, args.sentences, args.repeat), args.json, _print)
+
+
+if __name__ == "__main__":
+    main()
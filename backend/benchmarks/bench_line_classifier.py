@@ -0,0 +1,116 @@
+"""Compare the precompiled LineClassifier with the original per-method checks.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_line_classifier [--lines 10000] [--repeat 5] [--json]
+"""
+import argparse
+import random
+import re
+from typing import List
+
+from benchmarks.common import best_of, emit
+from ocr_config import OCRConfig, MeetingNotesConfig
+from ocr_service import LineClassifier
+
+SAMPLE_LINES = [
+    "- remember to review chapter four",
+    "1. Introduction to thermodynamics",
+    "(b) second law of motion",
+    "iv. closing remarks",
+    "→ follow up with the lab group",
+    "Name: Jane Doe",
+    "Date: 03/14/2024",
+    "Total amount due: 42 dollars",
+    "Q1 | 120 | 340 | 2.5",
+    "2019/20 | 14 | 18/22 | 7",
+    "The mitochondria is the powerhouse of the cell and produces ATP",
+    "Photosynthesis converts light energy into chemical energy in plants",
+    "short line",
+    "Chapter 3",
+    "see page 12",
+]
+
+
+def legacy_classify(config: OCRConfig, line: str) -> str:
+    """The original DocumentStructureAnalyzer checks, run one after another."""
+    for pattern in config.BULLET_PATTERNS:
+        if re.match(pattern, line, re.IGNORECASE):
+            return "bullet"
+
+    if ":" in line:
+        key, value = line.split(":", 1)
+        key_stripped, value_stripped = key.strip(), value.strip()
+        if (len(key_stripped.split()) <= config.MAX_KEY_WORDS
+                and len(value_stripped.split()) >= config.MIN_VALUE_WORDS):
+            key_lower = key_stripped.lower()
+            is_common_key = any(key_lower.startswith(prefix) for prefix in config.KEY_PREFIXES)
+            if (is_common_key or len(key_stripped.split()) <= 3) and key_stripped and value_stripped:
+                return "key_value"
+
+    words = line.split()
+    if len(words) >= config.MIN_TABLE_COLUMNS:
+        num_numeric = sum(1 for word in words if any(char.isdigit() for char in word))
+        numeric_ratio = num_numeric / len(words)
+        delimiter_count = sum(
+            1 for word in words
+            for delimiter in config.TABLE_DELIMITERS
+            if delimiter in word
+        )
+        avg_word_length = sum(len(w) for w in words) / len(words)
+        if avg_word_length <= 10 and numeric_ratio >= config.TABLE_NUMERIC_THRESHOLD and delimiter_count >= 2:
+            return "table"
+
+    if len(words) >= config.MIN_PARAGRAPH_WORDS and len(line) >= config.MIN_PARAGRAPH_CHARS:
+        return "paragraph"
+    return "other"
+
+
+def synthetic_document(line_count: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    return [rng.choice(SAMPLE_LINES) for _ in range(line_count)]
+
+
+def run(line_count: int = 10000, repeat: int = 5) -> dict:
+    results = {}
+    for base in (OCRConfig, MeetingNotesConfig):
+        config = type(base.__name__, (base,), {"DEBUG_MODE": False})
+        lines = synthetic_document(line_count)
+        classifier = LineClassifier(config)
+
+        mismatches = sum(1 for line in lines if classifier.classify(line)[0] != legacy_classify(config, line))
+
+        legacy = best_of(repeat, lambda: [legacy_classify(config, line) for line in lines])
+        compiled = best_of(repeat, lambda: [classifier.classify(line) for line in lines])
+
+        results[base.__name__] = {
+            "lines": line_count,
+            "legacy_seconds": legacy,
+            "compiled_seconds": compiled,
+            "speedup": legacy / compiled if compiled else float("inf"),
+            "mismatches": mismatches,
+        }
+    return results
+
+
+def _print(result: dict) -> None:
+    for name, timing in result.items():
+        print(
+            f"{name:<20} {timing['lines']} lines  legacy {timing['legacy_seconds'] * 1000:7.2f} ms  "
+            f"compiled {timing['compiled_seconds'] * 1000:7.2f} ms  "
+            f"speedup {timing['speedup']:.2f}x  mismatches {timing['mismatches']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    emit(run(args.lines, args.repeat), args.json, _print)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Time OCR response parsing against document size, fully offline.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_pipeline [--lines 50 200 1000 5000] [--repeat 5] [--json]
+
+`analyze` is the layout/classification pass alone; `extract` is
+extract_structured_text end to end with the replay provider (reading the
+recorded JSON, parsing it and analysing it), with the result cache off.
+"""
+import argparse
+import tempfile
+from typing import List
+
+from benchmarks.common import best_of, emit, peak_rss_mb
+from benchmarks.fixtures import record_responses, synthetic_response
+from ocr_config import OCRConfig
+from ocr_providers import ocr_providers
+from ocr_service import analyze_response, extract_structured_text
+
+
+class PipelineBenchConfig(OCRConfig):
+    USE_RESULT_CACHE = False
+    DEBUG_MODE = False
+
+
+def run(line_counts: List[int], repeat: int = 5) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as replay_dir:
+        ocr_providers.configure(provider="replay", replay_dir=replay_dir)
+        for line_count in line_counts:
+            response = synthetic_response(line_count)
+            image_bytes = f"synthetic-{line_count}".encode()
+            record_responses(replay_dir, [(image_bytes, response)])
+
+            analyze = best_of(repeat, lambda: analyze_response(response, PipelineBenchConfig))
+            extract = best_of(repeat, lambda: extract_structured_text(image_bytes, PipelineBenchConfig))
+            document = analyze_response(response, PipelineBenchConfig)
+
+            results[str(line_count)] = {
+                "analyze_seconds": analyze,
+                "extract_seconds": extract,
+                "analyze_us_per_line": analyze / line_count * 1e6,
+                "headers": len(document["headers"]),
+            }
+        ocr_providers.configure(provider=None)
+
+    return {"line_counts": results, "peak_rss_mb": peak_rss_mb()}
+
+
+def _print(result: dict) -> None:
+    for line_count, timing in result["line_counts"].items():
+        print(
+            f"{line_count:>6} lines  analyze {timing['analyze_seconds'] * 1000:8.2f} ms "
+            f"({timing['analyze_us_per_line']:.1f} us/line)  extract {timing['extract_seconds'] * 1000:8.2f} ms  "
+            f"headers {timing['headers']}"
+        )
+    print(f"peak rss {result['peak_rss_mb']:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[50, 200, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    emit(run(args.lines, args.repeat), args.json, _print)
+
+
+if __name__ == "__main__":
+    main()
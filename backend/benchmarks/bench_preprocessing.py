@@ -0,0 +1,96 @@
+"""Compare adaptive preprocessing with the original fixed five-variant pipeline.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_preprocessing [--repeat 3] [--no-legacy] [--json]
+
+With --no-legacy only the adaptive pipeline is timed (the legacy
+five-variant run takes seconds per page).
+"""
+import argparse
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from benchmarks.common import best_of, emit, peak_rss_mb
+from benchmarks.fixtures import text_page
+from image_preprocessing import decode_image, preprocess_image
+from ocr_config import OCRConfig
+
+
+def legacy_preprocess(image_bytes: bytes) -> List[bytes]:
+    img = decode_image(image_bytes)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    versions = [
+        gray,
+        cv2.fastNlMeansDenoising(gray, None, 10, 7, 21),
+        cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1],
+        cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2),
+        cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray),
+    ]
+    return [cv2.imencode('.png', version)[1].tobytes() for version in versions]
+
+
+# a clean 300dpi A4 scan and a noisy, dim, oversized phone photo of the same page
+def synthetic_images(seed: int = 7) -> Dict[str, bytes]:
+    scan = text_page(2480, 3508, seed)
+
+    rng = np.random.default_rng(seed)
+    photo = text_page(3000, 4000, seed).astype(np.float32)
+    photo = cv2.GaussianBlur(photo * 0.45 + 90, (5, 5), 0)
+    photo += rng.normal(0, 12, photo.shape[:2])[..., None]
+    photo = np.clip(photo, 0, 255).astype(np.uint8)
+
+    return {
+        "clean_scan": cv2.imencode('.png', scan)[1].tobytes(),
+        "noisy_photo": cv2.imencode('.jpg', photo, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes(),
+    }
+
+
+def run(repeat: int = 3, legacy: bool = True) -> dict:
+    config = type("BenchConfig", (OCRConfig,), {"DEBUG_MODE": False})
+    results = {}
+    for name, image_bytes in synthetic_images().items():
+        report = {}
+        preprocess_image(image_bytes, config, report)
+
+        adaptive = best_of(repeat, lambda: preprocess_image(image_bytes, config))
+        result = {
+            "variants": report["variants"],
+            "quality": report["quality"],
+            "adaptive_seconds": adaptive,
+            "pages_per_second": 1 / adaptive if adaptive else float("inf"),
+        }
+        if legacy:
+            result["legacy_seconds"] = best_of(repeat, lambda: legacy_preprocess(image_bytes))
+            result["speedup"] = result["legacy_seconds"] / adaptive if adaptive else float("inf")
+        results[name] = result
+    return {"images": results, "peak_rss_mb": peak_rss_mb()}
+
+
+def _print(result: dict) -> None:
+    for name, timing in result["images"].items():
+        quality = ", ".join(f"{key} {value:.1f}" for key, value in timing["quality"].items())
+        legacy = ""
+        if "legacy_seconds" in timing:
+            legacy = f"legacy {timing['legacy_seconds'] * 1000:8.1f} ms  speedup {timing['speedup']:.2f}x  "
+        print(
+            f"{name:<12} adaptive {timing['adaptive_seconds'] * 1000:8.1f} ms  {legacy}"
+            f"variants {','.join(timing['variants'])}  ({quality})"
+        )
+    print(f"peak rss {result['peak_rss_mb']:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-legacy", action="store_true", help="skip the original five-variant pipeline")
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    emit(run(args.repeat, not args.no_legacy), args.json, _print)
+
+
+if __name__ == "__main__":
+    main()
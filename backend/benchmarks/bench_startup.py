@@ -0,0 +1,74 @@
+"""Measure the cost of importing the API (`import main`) in a fresh interpreter.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_startup [--repeat 5] [--module main] [--json]
+
+Each run starts a new process so nothing is served from sys.modules. When
+DATABASE_URL is not set an in-memory SQLite URL is used, since importing
+main creates (but does not connect) the engine.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import emit
+
+# modules that should only load once OCR or image work actually happens
+HEAVY_MODULES = ("cv2", "google.cloud.vision", "grpc", "pypdfium2", "pytesseract")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str = "main") -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    # the probe's json is the last line; anything printed during import comes before it
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(module: str = "main", repeat: int = 5) -> dict:
+    samples = [measure(module) for _ in range(repeat)]
+    timings = [sample["seconds"] for sample in samples]
+    return {
+        "module": module,
+        "runs": repeat,
+        "median_seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "heavy_modules_loaded": samples[-1]["loaded"],
+    }
+
+
+def _print(result: dict) -> None:
+    print(
+        f"import {result['module']}: median {result['median_seconds'] * 1000:.1f} ms  "
+        f"min {result['min_seconds'] * 1000:.1f} ms over {result['runs']} runs  "
+        f"heavy modules loaded: {', '.join(result['heavy_modules_loaded']) or 'none'}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    emit(run(args.module, args.repeat), args.json, _print)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Helpers shared by the benchmark scripts."""
+import json
+import resource
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def sample(count: int, fn: Callable[[], object]) -> List[float]:
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+#p50/p95/p99/max/mean (seconds) of a list of timings
+def summarize(timings: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(timings),
+        "mean_seconds": statistics.fmean(timings),
+        "p50_seconds": percentile(timings, 0.5),
+        "p95_seconds": percentile(timings, 0.95),
+        "p99_seconds": percentile(timings, 0.99),
+        "max_seconds": max(timings),
+    }
+
+
+#high-water resident set size of this process
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+#print a result as json (for the suite runner) or through the script's own formatter
+def emit(result: dict, as_json: bool, formatter: Callable[[dict], None]) -> None:
+    if as_json:
+        print(json.dumps(result))
+    else:
+        formatter(result)
@@ -0,0 +1,93 @@
+"""Compare two result files written by benchmarks.run_suite.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.compare old.json new.json [--threshold 0.10]
+
+Every numeric metric whose name says which direction is better is listed
+with its ratio new/old. Exits with status 1 when any of them got worse by
+more than the threshold, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+# metric name suffix -> True when lower is better
+DIRECTIONS = (
+    ("_seconds", True),
+    ("_ms", True),
+    ("_mb", True),
+    ("_per_second", False),
+    ("speedup", False),
+)
+
+# bookkeeping timings that say nothing about the code under test
+IGNORED = ("wall_seconds",)
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    metrics = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            metrics.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        metrics[prefix] = float(value)
+    return metrics
+
+
+def lower_is_better(name: str) -> Optional[bool]:
+    leaf = name.rsplit(".", 1)[-1]
+    if leaf in IGNORED:
+        return None
+    for suffix, lower in DIRECTIONS:
+        if leaf.endswith(suffix):
+            return lower
+    return None
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    old_metrics = flatten(old["benchmarks"])
+    new_metrics = flatten(new["benchmarks"])
+    rows = []
+    for name in sorted(old_metrics.keys() & new_metrics.keys()):
+        lower = lower_is_better(name)
+        before, after = old_metrics[name], new_metrics[name]
+        if lower is None or before == 0:
+            continue
+        ratio = after / before
+        worse = ratio - 1 if lower else 1 - ratio
+        rows.append((name, before, after, ratio, worse > threshold))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown (default 0.10)")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    for label, suite in (("old", old), ("new", new)):
+        env = suite["environment"]
+        print(f"{label}: {env['commit'][:12]}{' (dirty)' if env['dirty'] else ''}  python {env['python']}  {env['cpu_count']} cpus")
+    if old["environment"]["platform"] != new["environment"]["platform"]:
+        print("warning: results come from different platforms")
+
+    rows = compare(old, new, args.threshold)
+    width = max((len(row[0]) for row in rows), default=10)
+    for name, before, after, ratio, regressed in rows:
+        print(f"{name:<{width}}  {before:12.6g}  {after:12.6g}  {ratio:6.2f}x{'  REGRESSION' if regressed else ''}")
+
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{len(rows)} metrics compared, {regressions} regressed beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Offline fixtures: synthetic note images and Vision-shaped responses for them."""
+import random
+from typing import Iterable, List, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_line_classifier import SAMPLE_LINES
+from ocr_providers import ReplayProvider
+
+# google vision DetectedBreak.BreakType values
+SPACE = 1
+LINE_BREAK = 5
+
+# a header line every HEADER_EVERY lines, drawn large and centered
+HEADER_EVERY = 25
+
+
+def text_page(width: int, height: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 255, np.uint8)
+    scale = width / 1200
+    y = int(80 * scale)
+    while y < height - int(60 * scale):
+        words = " ".join("lorem" if rng.random() < 0.5 else "ipsum dolor" for _ in range(8))
+        cv2.putText(page, words, (int(60 * scale), y), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), max(1, int(2 * scale)))
+        y += int(45 * scale)
+    return page
+
+
+#a png note page; different seeds give different bytes (and so different replay keys)
+def note_image(seed: int, width: int = 1240, height: int = 1754) -> bytes:
+    return cv2.imencode('.png', text_page(width, height, seed))[1].tobytes()
+
+
+def _word(text: str, x: int, y: int, height: int, last: bool) -> Tuple[dict, int]:
+    width = int(len(text) * height * 0.55)
+    symbols = [{"text": char} for char in text]
+    symbols[-1]["property"] = {"detected_break": {"type_": LINE_BREAK if last else SPACE}}
+    vertices = [{"x": x, "y": y}, {"x": x + width, "y": y}, {"x": x + width, "y": y + height}, {"x": x, "y": y + height}]
+    return {"symbols": symbols, "confidence": 0.95, "bounding_box": {"vertices": vertices}}, width
+
+
+#a vision response with full geometry: pages > blocks > paragraphs > words > symbols
+def synthetic_response(line_count: int, seed: int = 42, page_width: int = 1240, lines_per_page: int = 60):
+    from google.cloud import vision
+
+    rng = random.Random(seed)
+    pages = []
+    text_lines = []
+    for page_start in range(0, line_count, lines_per_page):
+        paragraphs = []
+        y = 60
+        for index in range(page_start, min(line_count, page_start + lines_per_page)):
+            if index % HEADER_EVERY == 0:
+                text, height, x = f"Chapter {index // HEADER_EVERY + 1}", 48, page_width // 2 - 120
+            else:
+                text, height, x = rng.choice(SAMPLE_LINES), 16, 80
+
+            words = []
+            parts = text.split()
+            for position, part in enumerate(parts):
+                word, width = _word(part, x, y, height, position == len(parts) - 1)
+                words.append(word)
+                x += width + height // 2
+
+            paragraphs.append({"words": words})
+            text_lines.append(text)
+            y += height + 12
+
+        pages.append({
+            "width": page_width,
+            "height": max(1754, y + 60),
+            "confidence": 0.95,
+            "blocks": [{"paragraphs": paragraphs}],
+        })
+
+    return vision.AnnotateImageResponse({
+        "full_text_annotation": {"text": "".join(line + "\n" for line in text_lines), "pages": pages}
+    })
+
+
+#save responses where the replay provider will look for them
+def record_responses(directory: str, fixtures: Iterable[Tuple[bytes, object]]) -> List[str]:
+    provider = ReplayProvider(directory)
+    paths = []
+    for image_bytes, response in fixtures:
+        path = provider.path_for(image_bytes)
+        provider.save(path, response)
+        paths.append(path)
+    return paths
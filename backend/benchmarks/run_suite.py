@@ -0,0 +1,99 @@
+"""Run every benchmark and write one machine-readable result file.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.run_suite [--quick] [--only pipeline api] [--output results.json]
+
+Each benchmark runs in its own interpreter (so peak RSS and import state
+are per benchmark) with --json. The result file records the git commit,
+whether the tree was dirty, and the machine it ran on; compare two of
+them with `python -m benchmarks.compare old.json new.json`.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# name -> (module, full arguments, --quick arguments)
+SUITE: Dict[str, tuple] = {
+    "line_classifier": ("benchmarks.bench_line_classifier", [], ["--lines", "2000", "--repeat", "3"]),
+    "preprocessing": ("benchmarks.bench_preprocessing", ["--no-legacy"], ["--no-legacy", "--repeat", "1"]),
+    "pipeline": ("benchmarks.bench_pipeline", [], ["--lines", "100", "1000", "--repeat", "2"]),
+    "api": ("benchmarks.bench_api", [], ["--uploads", "5", "--notes", "100", "1000", "--requests", "20"]),
+    "auth": ("benchmarks.bench_auth", [], ["--rounds", "10", "--logins", "16"]),
+    "categorize": ("benchmarks.bench_categorize", [], ["--notes", "1000", "--repeat", "1"]),
+    "startup": ("benchmarks.bench_startup", [], ["--repeat", "3"]),
+}
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def environment() -> dict:
+    return {
+        "commit": _git("rev-parse", "HEAD") or "unknown",
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def run_benchmark(module: str, args: List[str]) -> dict:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-m", module, *args, "--json"], capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1:] or ["exit %d" % completed.returncode], "wall_seconds": elapsed}
+    # the result is the last line; anything logged during the run comes before it
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["wall_seconds"] = elapsed
+    return result
+
+
+def run(names: List[str], quick: bool = False) -> dict:
+    results = {}
+    for name in names:
+        module, full_args, quick_args = SUITE[name]
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = run_benchmark(module, quick_args if quick else full_args)
+    return {"environment": environment(), "quick": quick, "benchmarks": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITE), help="run a subset of the suite")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast sanity check")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    suite = run(args.only or list(SUITE), args.quick)
+    output = args.output
+    if not output:
+        env = suite["environment"]
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        suffix = "-dirty" if env["dirty"] else ""
+        output = os.path.join(RESULTS_DIR, f"{env['commit'][:12]}{suffix}.json")
+
+    with open(output, "w") as f:
+        json.dump(suite, f, indent=2)
+    failed = [name for name, result in suite["benchmarks"].items() if "error" in result]
+    print(f"wrote {output}" + (f" ({', '.join(failed)} failed)" if failed else ""), file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
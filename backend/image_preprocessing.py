@@ -1,51 +1,281 @@
+import logging
+import time
 import cv2
 import numpy as np
-from typing import List
-# apply multiple preprocessing techniques to the image and return a list of the images
-def preprocess_image(image_bytes: bytes) -> List[bytes]:
-    print("Preprocessing THE IMAGE!!!!!")
+from typing import Any, Dict, Iterator, List, Optional
+
+from instrumentation import stage
+from ocr_config import DEFAULT_CONFIG, OCRConfig
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_ENCODINGS = {
+    "webp": ('.webp', cv2.IMWRITE_WEBP_QUALITY),
+    "jpeg": ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+}
+
+
+# detect multi-page containers by their magic bytes
+def document_kind(data: bytes) -> str:
+    if data.startswith(b'%PDF'):
+        return "pdf"
+    if data.startswith(b'II*\x00') or data.startswith(b'MM\x00*'):
+        return "tiff"
+    return "image"
+
+
+# yield each page as a standalone image, decoding one page at a time
+def iter_document_pages(data: bytes, pdf_dpi: int = 200) -> Iterator[bytes]:
+    kind = document_kind(data)
+    if kind == "pdf":
+        yield from _iter_pdf_pages(data, pdf_dpi)
+    elif kind == "tiff":
+        yield from _iter_tiff_pages(data)
+    else:
+        # single images pass through untouched (keeps their cache key stable)
+        yield data
+
+
+# imdecodemulti only takes a page range from opencv 4.10 on
+TIFF_PAGE_RANGE = tuple(int(part) for part in cv2.__version__.split(".")[:2]) >= (4, 10)
+
+
+def _iter_tiff_pages(data: bytes) -> Iterator[bytes]:
+    buffer = np.frombuffer(data, np.uint8)
+    if not TIFF_PAGE_RANGE:
+        # older opencv: decode every page up front
+        with stage("decode", kind="tiff"):
+            ok, pages = cv2.imdecodemulti(buffer, cv2.IMREAD_COLOR)
+        for page in pages if ok else ():
+            yield cv2.imencode('.png', page)[1].tobytes()
+        return
+
+    index = 0
+    while True:
+        with stage("decode", kind="tiff", page=index + 1):
+            ok, pages = cv2.imdecodemulti(buffer, cv2.IMREAD_COLOR, None, (index, index + 1))
+            if not ok or not pages:
+                return
+            page = pages[0]
+            del pages
+            # vision's synchronous api does not accept tiff, so pages go out as png
+            encoded = cv2.imencode('.png', page)[1].tobytes()
+        yield encoded
+        index += 1
+
+
+def _iter_pdf_pages(data: bytes, dpi: int) -> Iterator[bytes]:
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise ValueError("PDF uploads require the pypdfium2 package")
     
-    # Convert the byes to a numpy array, then to an opencv image
+    pdf = pdfium.PdfDocument(data)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            try:
+                with stage("decode", kind="pdf", page=index + 1):
+                    bitmap = page.render(scale=dpi / 72)
+                    img = bitmap.to_numpy()
+                    encoded = cv2.imencode('.png', img)[1].tobytes()
+                    bitmap.close()
+            finally:
+                page.close()
+            yield encoded
+    finally:
+        pdf.close()
+
+
+# Convert the bytes to a numpy array, then to an opencv image
+def decode_image(image_bytes: bytes) -> np.ndarray:
     nparr = np.frombuffer(image_bytes, np.uint8)
     img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image")
+    return img
+
+
+# shrink an image so its longest side is at most max_side (never upscales)
+def downscale(img: np.ndarray, max_side: int) -> np.ndarray:
+    height, width = img.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return img
+    new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
+
+
+# build compact previews (name -> encoded bytes) from a single decode, largest first
+def generate_previews(image_bytes: bytes, sizes: Dict[str, int], fmt: str = "webp", quality: int = 80) -> Dict[str, bytes]:
+    extension, quality_flag = PREVIEW_ENCODINGS[fmt]
+    if document_kind(image_bytes) == "pdf":
+        # previews of a pdf show its first page
+        image_bytes = next(iter_document_pages(image_bytes))
+    img = decode_image(image_bytes)
     
-    processed_versions = []
+    previews = {}
+    # each smaller size is resized from the previous one instead of the full original
+    for name, max_side in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        img = downscale(img, max_side)
+        ok, buffer = cv2.imencode(extension, img, [quality_flag, quality])
+        if not ok:
+            raise ValueError(f"Could not encode {name} preview as {fmt}")
+        previews[name] = buffer.tobytes()
     
-    # Convert to a grayscale first
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    processed_versions.append(gray)
-    print("Grayscale image created: ", processed_versions)
+    return previews
 
-    # denoise the grayscale image
-    denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-    processed_versions.append(denoised)
-    print("denoised image: ", processed_versions)
 
-    # appply Otsu's thresholding to the grayscale image
-    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    processed_versions.append(binary)
-    print("thresholding created", processed_versions)
+# laplacian kernel used by the fast noise estimate (Immerkaer, 1996)
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
 
+# side of the full-resolution center crop used for the sharpness/noise estimate
+QUALITY_SAMPLE_SIZE = 512
 
-    # apply adaptive thresholding to the grayscale image
-    adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-    processed_versions.append(adaptive)
-    print("adaptive thresholding created: ", processed_versions)
+# sobel gradient magnitude (|gx| + |gy|) above which a pixel counts as an edge;
+# far above what sensor noise reaches, well below any ink stroke
+EDGE_THRESHOLD = 100.0
 
+# fewest flat pixels (share of the crop) the noise estimate is averaged over
+MIN_FLAT_FRACTION = 0.1
 
-    
-    # apply CLAHE (Contrast Limited Adaptive Histogram Equalization) to the grayscale image
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    enhanced = clahe.apply(gray)
-    processed_versions.append(enhanced)
-    print("CLAHE enhanced image created: ", processed_versions)
 
+def _edge_mask(gray: np.ndarray) -> np.ndarray:
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0)
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1)
+    return (np.abs(gx) + np.abs(gy)) > EDGE_THRESHOLD
+
+
+# cheap quality estimate: global contrast, share of edge pixels (content),
+# sharpness (laplacian variance) and noise sigma
+def estimate_quality(gray: np.ndarray) -> Dict[str, float]:
+    # contrast and content from a small copy, sharpness and noise from a
+    # full-resolution crop, since downscaling hides both blur and noise
+    small = downscale(gray, QUALITY_SAMPLE_SIZE)
+    contrast = float(small.std())
+    content = float(_edge_mask(small).mean())
+
+    height, width = gray.shape
+    top = max(0, (height - QUALITY_SAMPLE_SIZE) // 2)
+    left = max(0, (width - QUALITY_SAMPLE_SIZE) // 2)
+    sample = gray[top:top + QUALITY_SAMPLE_SIZE, left:left + QUALITY_SAMPLE_SIZE]
+
+    sharpness = float(cv2.Laplacian(sample, cv2.CV_32F).var())
+
+    # the laplacian responds to text strokes as strongly as to noise, so it is
+    # only averaged over flat pixels: those with no edge in their 3x3 neighbourhood
+    noise = 0.0
+    if sample.shape[0] > 2 and sample.shape[1] > 2:
+        response = np.abs(cv2.filter2D(sample.astype(np.float32), -1, NOISE_KERNEL)[1:-1, 1:-1])
+        edges = cv2.dilate(_edge_mask(sample).astype(np.uint8), np.ones((3, 3), np.uint8))[1:-1, 1:-1]
+        flat = response[edges == 0]
+        # so noisy that almost everything is an "edge": the whole crop is a fair estimate
+        if flat.size < MIN_FLAT_FRACTION * response.size:
+            flat = response
+        noise = float(np.sqrt(np.pi / 2) * flat.mean() / 6)
+
+    return {"contrast": contrast, "content": content, "sharpness": sharpness, "noise": noise}
 
 
-    # convert them back to bytes
+# pick the variants worth sending to vision for an image of the given quality
+def select_variants(quality: Dict[str, float], config: OCRConfig = DEFAULT_CONFIG) -> List[str]:
+    if not config.ADAPTIVE_PREPROCESSING:
+        return list(ALL_VARIANTS)
+
+    # a blank page has nothing for the other variants to recover
+    if quality["content"] < config.BLANK_CONTENT_THRESHOLD:
+        return ["grayscale"]
+
+    is_noisy = quality["noise"] >= config.NOISE_DENOISE_THRESHOLD
+    is_low_contrast = quality["contrast"] < config.LOW_CONTRAST_THRESHOLD
+    is_blurry = quality["sharpness"] < config.BLUR_THRESHOLD
+
+    # a clean, sharp, high-contrast scan only needs the plain and binarized versions
+    if not (is_noisy or is_low_contrast or is_blurry):
+        return ["grayscale", "otsu"]
+
+    variants = ["grayscale"]
+    if is_noisy:
+        variants.append("denoised")
+    variants.extend(["otsu", "adaptive"])
+    if is_low_contrast:
+        variants.append("clahe")
+    if is_blurry:
+        variants.append("sharpened")
+    return variants
+
+
+def _denoised(gray: np.ndarray) -> np.ndarray:
+    return cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+
+
+def _otsu(gray: np.ndarray) -> np.ndarray:
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def _adaptive(gray: np.ndarray) -> np.ndarray:
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+
+
+def _clahe(gray: np.ndarray) -> np.ndarray:
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+
+
+def _sharpened(gray: np.ndarray) -> np.ndarray:
+    blurred = cv2.GaussianBlur(gray, (0, 0), 3)
+    return cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
+
+
+VARIANT_BUILDERS = {
+    "grayscale": lambda gray: gray,
+    "denoised": _denoised,
+    "otsu": _otsu,
+    "adaptive": _adaptive,
+    "clahe": _clahe,
+    "sharpened": _sharpened,
+}
+
+# the original fixed set, still used when adaptive preprocessing is off
+ALL_VARIANTS = ("grayscale", "denoised", "otsu", "adaptive", "clahe")
+
+
+# build the preprocessing variants for an image, cheapest useful set first.
+# when a report dict is passed it is filled with the quality estimate, the chosen
+# variants and per-step timings in seconds
+def preprocess_image(image_bytes: bytes, config: OCRConfig = DEFAULT_CONFIG,
+                     report: Optional[Dict[str, Any]] = None) -> List[bytes]:
+    timings = {}
+
+    # every variant is grayscale, so decode straight to one channel
+    started = time.perf_counter()
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Could not decode image")
+    gray = downscale(gray, config.PREPROCESS_MAX_SIDE)
+    timings["decode"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    quality = estimate_quality(gray)
+    variants = select_variants(quality, config)
+    timings["quality"] = time.perf_counter() - started
+
+    encode_params = [cv2.IMWRITE_PNG_COMPRESSION, config.PREPROCESS_PNG_COMPRESSION]
     result_bytes = []
-    for processed in processed_versions:
-        _, buffer = cv2.imencode('.png', processed)
+    for name in variants:
+        started = time.perf_counter()
+        processed = VARIANT_BUILDERS[name](gray)
+        ok, buffer = cv2.imencode('.png', processed, encode_params)
+        if not ok:
+            raise ValueError(f"Could not encode {name} variant")
         result_bytes.append(buffer.tobytes())
-    
-    return result_bytes
\ No newline at end of file
+        timings[name] = time.perf_counter() - started
+
+    if config.DEBUG_MODE:
+        logger.debug("Preprocessed %dx%d image into %s (quality: %s)", gray.shape[1], gray.shape[0], variants, quality)
+
+    if report is not None:
+        report["quality"] = quality
+        report["variants"] = variants
+        report["timings"] = timings
+
+    return result_bytes
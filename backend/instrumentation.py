@@ -0,0 +1,369 @@
+#structured logging, stage timers and prometheus-style metrics for the ocr pipeline
+import bisect
+import json
+import logging
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("instrumentation")
+
+# seconds; covers a cheap layout pass up to a slow multi-variant vision round trip
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# standard LogRecord attributes, everything else passed via extra= is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    """Base for lock-protected metrics keyed by a tuple of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def _render_samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            cumulative += counts[-1]
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def _render_samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class CallbackMetric(Metric):
+    """A metric read from its owner at scrape time, so the hot path pays nothing.
+
+    The callback returns a number, or a dict mapping label-value tuples to numbers.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, callback: Callable[[], Any],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def _render_samples(self) -> Iterable[str]:
+        try:
+            values = self.callback()
+        except Exception:
+            logger.warning("Metric callback failed", exc_info=True, extra={"metric": self.name})
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def callback(self, name: str, documentation: str, kind: str, callback: Callable[[], Any],
+                 labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, kind, callback, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "ocr_stage_seconds", "Time spent in each OCR pipeline stage.", ("stage",)
+)
+STAGE_ERRORS = registry.counter(
+    "ocr_stage_errors_total", "OCR pipeline stages that raised an exception.", ("stage",)
+)
+PREPROCESS_STEP_SECONDS = registry.histogram(
+    "ocr_preprocess_step_seconds", "Time spent per preprocessing step (decode, quality, each variant).", ("step",)
+)
+PROVIDER_SECONDS = registry.histogram(
+    "ocr_provider_request_seconds", "Latency of OCR provider calls (one per image variant).", ("provider",)
+)
+PROVIDER_REQUESTS = registry.counter(
+    "ocr_provider_requests_total", "OCR provider calls by outcome (ok, error response, exception).",
+    ("provider", "outcome")
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "API request latency, until the last body chunk is sent.", ("method", "route")
+)
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "API requests by route and status code.", ("method", "route", "status")
+)
+DB_TRANSACTION_SECONDS = registry.histogram(
+    "db_transaction_seconds", "Time from a session's first statement to its commit or rollback.", ("outcome",)
+)
+
+_enabled = True
+
+
+class _StageTimer:
+    __slots__ = ("name", "fields", "started")
+
+    def __init__(self, name: str, fields: Dict[str, Any]):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self) -> "_StageTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.name)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("stage finished", extra={
+                "stage": self.name,
+                "duration_ms": round(elapsed * 1000, 3),
+                "error": exc_type.__name__ if exc_type else None,
+                **self.fields,
+            })
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+#time a pipeline stage: `with stage("vision", provider="google_vision"): ...`
+def stage(name: str, **fields: Any):
+    if not _enabled:
+        return _NULL_TIMER
+    return _StageTimer(name, fields)
+
+
+#record the per-step timings collected by preprocess_image
+def observe_preprocessing(timings: Dict[str, float]) -> None:
+    if not _enabled:
+        return
+    for step, seconds in timings.items():
+        PREPROCESS_STEP_SECONDS.observe(seconds, step=step)
+
+
+#record one ocr provider call; outcome is "ok", "error" (error response) or "exception"
+def observe_provider_call(provider: str, seconds: float, outcome: str) -> None:
+    if not _enabled:
+        return
+    PROVIDER_SECONDS.observe(seconds, provider=provider)
+    PROVIDER_REQUESTS.inc(provider=provider, outcome=outcome)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method and route template.
+
+    Requests that match no route share one "unmatched" label, so scanners
+    hitting random paths cannot blow up the number of series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # the router stores the matched route on the scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, route=path)
+            HTTP_REQUESTS.inc(method=method, route=path, status=status_code)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with extra= fields merged in at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+#set up the root logger and turn the timers/metrics on or off
+def configure(enabled: bool = True, log_level: str = "INFO", log_format: str = "json",
+              stream: Optional[Any] = None) -> None:
+    global _enabled
+    _enabled = enabled
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if getattr(existing, "_instrumentation", False):
+            root.removeHandler(existing)
+    handler._instrumentation = True
+    root.addHandler(handler)
+    root.setLevel(log_level.upper())
@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+import logging
 import os
 
 # Load environment variables from .env
@@ -8,18 +9,30 @@ load_dotenv()
 if os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"):
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
 
-from fastapi import FastAPI, UploadFile, File, Depends
+from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 
-from app.database import create_tables, get_db
+from app.config import get_settings
+from app.database import SessionLocal, create_tables, dispose_engines
 from app.routes.auth_routes import router as auth_router
 from app.routes.note_routes import router as note_router
-from app.controllers.auth_controller import get_current_user
-from app.models.user import User
+from app.search import get_search_index
+from app.services.ocr_jobs import ocr_queue
+from app.services.password_hasher import password_hasher
+from app.services.user_cache import token_cache, user_cache
+from app.storage.backfill import LEGACY_COLUMN as LEGACY_IMAGE_COLUMN, move_inline_images
 
 # Import existing OCR service
-from ocr_service import extract_structured_text
+from ocr_service import extract_document
+from ocr_cache import ocr_cache
+from preprocess_pool import preprocess_pool
+from ocr_providers import ocr_providers
+import instrumentation
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 app = FastAPI(
@@ -34,8 +47,13 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    # so browser clients can read the note list's pagination cursor
+    expose_headers=["X-Next-Cursor"],
 )
 
+# outermost, so the latency covers every other middleware too
+app.add_middleware(instrumentation.RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(note_router)
@@ -43,8 +61,52 @@ app.include_router(note_router)
 
 @app.on_event("startup")
 def startup_event():
-    """Create database tables on startup."""
-    create_tables()
+    """Create database tables, prepare search and resume unfinished OCR jobs."""
+    instrumentation.configure(
+        enabled=settings.metrics_enabled,
+        log_level=settings.log_level,
+        log_format=settings.log_format
+    )
+    # SQLite cannot relax NOT NULL on the old inline image column, so its images
+    # move out now; on Postgres `python -m app.storage.backfill` does it offline
+    if f"notes.{LEGACY_IMAGE_COLUMN}" in create_tables():
+        result = move_inline_images()
+        logger.info("Moved inline note images into the blob store", extra={"moved": result.moved})
+    db = SessionLocal()
+    try:
+        get_search_index().setup(db)
+    finally:
+        db.close()
+    ocr_cache.configure(
+        max_bytes=settings.ocr_cache_max_bytes,
+        disk_path=settings.ocr_cache_path or None,
+        disk_max_bytes=settings.ocr_cache_disk_max_bytes
+    )
+    preprocess_pool.configure(settings.preprocess_workers, settings.preprocess_max_pending)
+    ocr_providers.configure(provider=settings.ocr_provider or None, replay_dir=settings.ocr_replay_dir)
+    user_cache.configure(max_entries=settings.user_cache_size, ttl=settings.user_cache_ttl)
+    token_cache.configure(max_entries=settings.token_cache_size)
+    password_hasher.configure(
+        settings.bcrypt_rounds,
+        settings.password_hash_workers,
+        settings.password_hash_max_pending
+    )
+    ocr_queue.start()
+    ocr_queue.requeue_unfinished()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Let in-flight OCR jobs finish before exiting."""
+    ocr_queue.shutdown(wait=True)
+    preprocess_pool.shutdown()
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_database():
+    """Close pooled connections of the async engine used by request handlers."""
+    await dispose_engines()
 
 
 # Original OCR endpoint (no auth - for testing)
@@ -56,17 +118,37 @@ async def ocr(file: UploadFile = File(...)):
     if not contents:
         return {"error": "Uploaded file is empty"}
     
-    print(f"File name: {file.filename}, Content type: {file.content_type}, Size: {len(contents)} bytes")
+    # "filename" is a LogRecord attribute, so extra= cannot use it
+    logger.info("OCR request", extra={
+        "upload_filename": file.filename,
+        "content_type": file.content_type,
+        "bytes": len(contents),
+    })
     
     try:
-        structured_data = extract_structured_text(contents)
+        structured_data = await run_in_threadpool(extract_document, contents)
     except Exception as e:
+        logger.exception("OCR request failed", extra={"upload_filename": file.filename})
         return {"error": str(e)}
     
-    print(structured_data)
     return structured_data
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics for this process (request latency, OCR pipeline, DB, cache)."""
+    return PlainTextResponse(
+        instrumentation.registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/ocr/cache")
+def ocr_cache_stats():
+    """OCR result cache hit/miss counters."""
+    return ocr_cache.stats()
+
+
 @app.get("/")
 def root():
     """Root endpoint."""
@@ -0,0 +1,225 @@
+#content-addressed cache for structured OCR results
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from instrumentation import registry
+from ocr_config import OCRConfig
+
+# config attributes that do not change the OCR output, so they stay out of the fingerprint
+FINGERPRINT_EXCLUDE = {
+    'DEBUG_MODE',
+    'USE_RESULT_CACHE',
+    'PREPROCESSING_MAX_CONCURRENCY',
+    'MAX_PARALLEL_PAGES',
+    # the provider actually used is passed to make_key, since Settings can override it
+    'OCR_PROVIDER',
+}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(_normalize(v) for v in value)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+#hash every rule on the config class (including inherited ones) that affects the output
+def config_fingerprint(config: OCRConfig) -> str:
+    rules = {
+        name: _normalize(getattr(config, name))
+        for name in dir(config)
+        if name.isupper() and name not in FINGERPRINT_EXCLUDE
+    }
+    encoded = json.dumps(rules, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class OCRResultCache:
+    """Two-tier (memory LRU + optional SQLite) cache keyed by image hash and config.
+
+    The disk tier is bounded too: once a write takes it over disk_max_bytes,
+    the oldest entries are deleted until it is back under DISK_EVICT_TARGET
+    of the limit, so a full cache does not evict on every write.
+    """
+
+    DISK_EVICT_TARGET = 0.9
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_path: Optional[str] = None,
+                 disk_max_bytes: int = 1024 * 1024 * 1024):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._fingerprints: Dict[type, str] = {}
+        self._size = 0
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_size = 0
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_path = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def configure(self, max_bytes: Optional[int] = None, disk_path: Optional[str] = None,
+                  disk_max_bytes: Optional[int] = None) -> None:
+        """Resize either tier and/or attach an on-disk tier."""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+                self._evict()
+            if disk_max_bytes is not None:
+                self.disk_max_bytes = disk_max_bytes
+        if disk_path and disk_path != self.disk_path:
+            self._open_disk(disk_path)
+        with self._lock:
+            if self._disk is not None and self._disk_size > self.disk_max_bytes:
+                self._evict_disk()
+                self._disk.commit()
+
+    def _open_disk(self, disk_path: str) -> None:
+        conn = sqlite3.connect(disk_path, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_ocr_cache_created_at ON ocr_cache (created_at)")
+        conn.commit()
+        disk_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+            self._disk = conn
+            self._disk_size = disk_size
+            self.disk_path = disk_path
+
+    def make_key(self, image_bytes: bytes, config: OCRConfig, provider: str = "") -> str:
+        """Build the cache key for an image processed with a given config and provider."""
+        fingerprint = self._fingerprints.get(config)
+        if fingerprint is None:
+            fingerprint = config_fingerprint(config)
+            self._fingerprints[config] = fingerprint
+        return f"{hashlib.sha256(image_bytes).hexdigest()}:{fingerprint}:{provider}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result, or None on a miss."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+            elif self._disk is not None:
+                row = self._disk.execute("SELECT value FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    payload = bytes(row[0])
+                    self.disk_hits += 1
+                    self._store(key, payload)
+            if payload is None:
+                self.misses += 1
+                return None
+        return json.loads(payload)
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result in every tier."""
+        payload = json.dumps(result, ensure_ascii=False, default=str).encode('utf-8')
+        with self._lock:
+            self._store(key, payload)
+            if self._disk is not None and len(payload) <= self.disk_max_bytes:
+                previous = self._disk.execute("SELECT size FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (key, value, size, created_at) VALUES (?, ?, ?, ?)",
+                    (key, payload, len(payload), time.time())
+                )
+                self._disk_size += len(payload) - (previous[0] if previous else 0)
+                if self._disk_size > self.disk_max_bytes:
+                    self._evict_disk()
+                self._disk.commit()
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM ocr_cache")
+                self._disk.commit()
+                self._disk_size = 0
+            self.memory_hits = self.disk_hits = self.misses = self.evictions = self.disk_evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory usage for monitoring."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "disk_enabled": self._disk is not None,
+                "disk_evictions": self.disk_evictions,
+                "disk_size_bytes": self._disk_size,
+                "disk_max_bytes": self.disk_max_bytes,
+            }
+
+    # caller must hold the lock
+    def _store(self, key: str, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = payload
+        self._size += len(payload)
+        self._evict()
+
+    # caller must hold the lock
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            _, payload = self._entries.popitem(last=False)
+            self._size -= len(payload)
+            self.evictions += 1
+
+    # caller must hold the lock and commit afterwards
+    def _evict_disk(self) -> None:
+        target = self.disk_max_bytes * self.DISK_EVICT_TARGET
+        victims = []
+        for key, size in self._disk.execute("SELECT key, size FROM ocr_cache ORDER BY created_at"):
+            if self._disk_size <= target:
+                break
+            victims.append((key,))
+            self._disk_size -= size
+        self._disk.executemany("DELETE FROM ocr_cache WHERE key = ?", victims)
+        self.disk_evictions += len(victims)
+
+
+ocr_cache = OCRResultCache()
+
+# read at scrape time, so lookups only pay for the counters they already keep
+registry.callback(
+    "ocr_cache_lookups_total", "OCR result cache lookups by outcome.", "counter",
+    lambda: {("memory_hit",): ocr_cache.memory_hits, ("disk_hit",): ocr_cache.disk_hits, ("miss",): ocr_cache.misses},
+    ("result",)
+)
+registry.callback("ocr_cache_hit_ratio", "Share of OCR cache lookups served from either tier.", "gauge",
+                  lambda: ocr_cache.stats()["hit_ratio"])
+registry.callback("ocr_cache_size_bytes", "Bytes held by the in-memory OCR cache tier.", "gauge",
+                  lambda: ocr_cache.stats()["size_bytes"])
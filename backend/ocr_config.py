@@ -2,8 +2,52 @@
 
 class OCRConfig:
     
+    # OCR engine: "google_vision", "tesseract" (local), "replay" (recorded responses)
+    # or "record" (google_vision, saving each response for replay)
+    OCR_PROVIDER = "google_vision"
+    
+    # Tesseract language pack(s), e.g. "eng" or "eng+deu"
+    TESSERACT_LANG = "eng"
+    
     USE_IMAGE_PREPROCESSING = False
     
+    # Maximum number of preprocessing variants sent to Vision at the same time
+    PREPROCESSING_MAX_CONCURRENCY = 5
+    
+    # Early exit: accept the first variant that passes these thresholds and
+    # cancel the variants that have not been sent yet (None disables a check)
+    EARLY_EXIT_MIN_TEXT_LENGTH = None
+    EARLY_EXIT_MIN_CONFIDENCE = None
+    
+    # Reuse results for identical image bytes processed with the same rules
+    USE_RESULT_CACHE = True
+    
+    # Multi-page PDF/TIFF uploads: pages OCR'd at the same time, PDF render resolution
+    MAX_PARALLEL_PAGES = 4
+    PDF_RENDER_DPI = 200
+    
+    # Adaptive preprocessing: a cheap quality estimate decides which variants are built
+    # (False builds the fixed five-variant set)
+    ADAPTIVE_PREPROCESSING = True
+    
+    # Pages are downscaled so their longest side is at most this many pixels
+    PREPROCESS_MAX_SIDE = 2560
+    
+    # Share of edge pixels below which a page counts as blank (grayscale variant only)
+    BLANK_CONTENT_THRESHOLD = 0.0002
+    
+    # Estimated noise sigma (measured away from edges) at or above which the (slow) denoised variant is built
+    NOISE_DENOISE_THRESHOLD = 5.0
+    
+    # Grayscale standard deviation below which the image counts as low contrast (adds CLAHE)
+    LOW_CONTRAST_THRESHOLD = 40.0
+    
+    # Laplacian variance below which the image counts as blurry (adds a sharpened variant)
+    BLUR_THRESHOLD = 100.0
+    
+    # PNG compression for variants sent to Vision (0-9, lower is faster)
+    PREPROCESS_PNG_COMPRESSION = 1
+    
     
     
     
@@ -92,8 +136,8 @@ class OCRConfig:
     # Confidence threshold for Google Vision API (0.0 to 1.0)
     MIN_CONFIDENCE = 0.5
     
-    # Enable debug logging
-    DEBUG_MODE = True
+    # Log every detection (bullets, key-values, tables, headers) at DEBUG level
+    DEBUG_MODE = False
 
 
 # custom config for academic papers
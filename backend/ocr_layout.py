@@ -0,0 +1,231 @@
+#compact, array-backed model of the text, words and lines in a vision response
+import re
+from typing import List, Optional
+
+import numpy as np
+
+# google vision TextAnnotation.DetectedBreak.BreakType values
+BREAK_SPACE = 1
+BREAK_SURE_SPACE = 2
+BREAK_EOL_SURE_SPACE = 3
+BREAK_HYPHEN = 4
+BREAK_LINE_BREAK = 5
+
+WHITESPACE = re.compile(r"\s+")
+
+# how far ahead to look for a layout line when the text lines and layout drift apart
+MATCH_LOOKAHEAD = 8
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE.sub("", text)
+
+
+def _raw_message(response):
+    # proto-plus wraps every nested message again on each attribute access;
+    # the underlying protobuf is read directly at C speed
+    to_pb = getattr(type(response), "pb", None)
+    return to_pb(response) if to_pb is not None else response
+
+
+class LayoutTable:
+    """Compact document model of a response, built in a single walk.
+
+    Holds everything parsing needs (the full text, word text in one buffer
+    with offsets, word/line/page geometry as arrays) so the protobuf tree
+    can be dropped as soon as the table exists. Words are stored in reading
+    order and every line owns a contiguous run of words, so per-line
+    aggregates are simple reductions over word_line.
+    """
+
+    __slots__ = (
+        "text", "word_buffer", "word_offsets", "word_line", "word_boxes", "word_heights",
+        "word_confidence", "line_text", "line_page", "page_widths", "page_heights",
+    )
+
+    def __init__(self, text: str, word_buffer: str, word_offsets: np.ndarray, word_line: np.ndarray,
+                 word_boxes: np.ndarray, word_heights: np.ndarray, word_confidence: np.ndarray,
+                 line_text: List[str], line_page: np.ndarray, page_widths: np.ndarray,
+                 page_heights: np.ndarray):
+        self.text = text
+        self.word_buffer = word_buffer
+        self.word_offsets = word_offsets
+        self.word_line = word_line
+        self.word_boxes = word_boxes
+        self.word_heights = word_heights
+        self.word_confidence = word_confidence
+        self.line_text = line_text
+        self.line_page = line_page
+        self.page_widths = page_widths
+        self.page_heights = page_heights
+
+    @classmethod
+    def from_response(cls, response) -> "LayoutTable":
+        annotation = _raw_message(response).full_text_annotation
+        word_text = []
+        word_line = []
+        boxes = []
+        heights = []
+        confidence = []
+        line_text = []
+        line_page = []
+        page_widths = []
+        page_heights = []
+        parts = []
+        missing_box = (np.nan, np.nan, np.nan, np.nan)
+
+        def end_line(page_index: int) -> None:
+            text = "".join(parts).strip()
+            parts.clear()
+            if text:
+                line_text.append(text)
+                line_page.append(page_index)
+
+        for page_index, page in enumerate(annotation.pages):
+            page_widths.append(page.width)
+            page_heights.append(page.height)
+
+            for block in page.blocks:
+                for paragraph in block.paragraphs:
+                    for word in paragraph.words:
+                        symbols = word.symbols
+                        text = "".join([symbol.text for symbol in symbols])
+                        if not text.strip():
+                            continue
+
+                        vertices = word.bounding_box.vertices
+                        if vertices:
+                            xs = [v.x for v in vertices]
+                            ys = [v.y for v in vertices]
+                            boxes.append((min(xs), min(ys), max(xs), max(ys)))
+                            heights.append(ys[2] - ys[0] if len(ys) >= 3 else np.nan)
+                        else:
+                            boxes.append(missing_box)
+                            heights.append(np.nan)
+                        confidence.append(word.confidence)
+                        word_text.append(text)
+                        word_line.append(len(line_text))
+
+                        # the break after the last symbol says how this word joins the next one
+                        parts.append(text)
+                        break_type = symbols[-1].property.detected_break.type_
+                        if break_type in (BREAK_SPACE, BREAK_SURE_SPACE):
+                            parts.append(" ")
+                        elif break_type == BREAK_HYPHEN:
+                            parts.append("-")
+                            end_line(page_index)
+                        elif break_type in (BREAK_EOL_SURE_SPACE, BREAK_LINE_BREAK):
+                            end_line(page_index)
+
+                    # a paragraph never continues a line into the next one
+                    end_line(page_index)
+
+        offsets = np.zeros(len(word_text) + 1, dtype=np.int32)
+        np.cumsum([len(text) for text in word_text], out=offsets[1:])
+
+        return cls(
+            text=annotation.text,
+            word_buffer="".join(word_text),
+            word_offsets=offsets,
+            word_line=np.asarray(word_line, dtype=np.int32),
+            word_boxes=np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+            word_heights=np.asarray(heights, dtype=np.float32),
+            word_confidence=np.asarray(confidence, dtype=np.float32),
+            line_text=line_text,
+            line_page=np.asarray(line_page, dtype=np.int32),
+            page_widths=np.asarray(page_widths, dtype=np.float32),
+            page_heights=np.asarray(page_heights, dtype=np.float32),
+        )
+
+    @property
+    def word_count(self) -> int:
+        return len(self.word_offsets) - 1
+
+    def word(self, index: int) -> str:
+        return self.word_buffer[self.word_offsets[index]:self.word_offsets[index + 1]]
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_text)
+
+    def avg_font_size(self) -> Optional[float]:
+        valid = self.word_heights[~np.isnan(self.word_heights)]
+        return float(valid.mean(dtype=np.float64)) if valid.size else None
+
+    def _line_starts(self) -> np.ndarray:
+        if not self.word_line.size:
+            return np.zeros(0, dtype=np.intp)
+        return np.flatnonzero(np.r_[True, self.word_line[1:] != self.word_line[:-1]])
+
+    #mean word height of every line (nan where no word had a box)
+    def line_font_sizes(self) -> np.ndarray:
+        valid = ~np.isnan(self.word_heights)
+        lines = self.word_line[valid]
+        sums = np.bincount(lines, weights=self.word_heights[valid], minlength=self.line_count)
+        counts = np.bincount(lines, minlength=self.line_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts
+
+    #bounding box (x0, y0, x1, y1) of every line
+    def line_boxes(self) -> np.ndarray:
+        if not self.line_count:
+            return np.zeros((0, 4))
+        starts = self._line_starts()
+        boxes = self.word_boxes
+        return np.column_stack([
+            np.fmin.reduceat(boxes[:, 0], starts),
+            np.fmin.reduceat(boxes[:, 1], starts),
+            np.fmax.reduceat(boxes[:, 2], starts),
+            np.fmax.reduceat(boxes[:, 3], starts),
+        ])
+
+    def line_confidences(self) -> np.ndarray:
+        counts = np.bincount(self.word_line, minlength=self.line_count)
+        sums = np.bincount(self.word_line, weights=self.word_confidence, minlength=self.line_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts
+
+    #horizontal center of every line as a fraction of its page width (nan when unknown)
+    def line_center_ratios(self) -> np.ndarray:
+        boxes = self.line_boxes()
+        centers = (boxes[:, 0] + boxes[:, 2]) / 2
+        widths = self.page_widths[self.line_page] if self.line_count else np.zeros(0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(widths > 0, centers / widths, np.nan)
+
+    #vectorized version of DocumentStructureAnalyzer.is_section_header for every line
+    def header_mask(self, avg_font_size: Optional[float], use_spatial: bool = True) -> np.ndarray:
+        if not avg_font_size or not self.line_count:
+            return np.zeros(self.line_count, dtype=bool)
+
+        sizes = self.line_font_sizes()
+        with np.errstate(invalid="ignore"):
+            is_large = sizes >= avg_font_size * 2.0
+            is_very_large = sizes >= avg_font_size * 2.5
+            if use_spatial:
+                ratios = self.line_center_ratios()
+                is_centered = (ratios >= 0.3) & (ratios <= 0.7)
+            else:
+                is_centered = np.zeros(self.line_count, dtype=bool)
+
+        return (is_large & is_centered) | is_very_large
+
+    #map each text line to its layout line index (-1 when it has no geometry)
+    def match_lines(self, lines: List[str]) -> List[int]:
+        normalized = [_normalize(text) for text in self.line_text]
+        matches = []
+        cursor = 0
+
+        # both sides are in reading order, so walk them together; duplicates stay distinct
+        for line in lines:
+            target = _normalize(line)
+            found = -1
+            for index in range(cursor, min(cursor + MATCH_LOOKAHEAD, len(normalized))):
+                if normalized[index] == target:
+                    found = index
+                    break
+            if found >= 0:
+                cursor = found + 1
+            matches.append(found)
+
+        return matches
@@ -0,0 +1,224 @@
+#pluggable ocr engines; every provider answers with a vision-shaped AnnotateImageResponse
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, Optional
+
+from ocr_config import DEFAULT_CONFIG, OCRConfig
+
+# google.cloud.vision (and grpc behind it) is imported on first use, not at startup
+if TYPE_CHECKING:
+    from google.cloud import vision
+
+
+class OCRProvider(ABC):
+    """An OCR engine that turns image bytes into a document text response."""
+
+    name = ""
+
+    @abstractmethod
+    def detect_document_text(self, image_bytes: bytes) -> "vision.AnnotateImageResponse":
+        """Run document text detection on one image."""
+
+
+class GoogleVisionProvider(OCRProvider):
+    """Google Cloud Vision document text detection (network, billed per call)."""
+
+    name = "google_vision"
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # created on first use so importing the service never needs credentials
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google.cloud import vision
+                    self._client = vision.ImageAnnotatorClient()
+        return self._client
+
+    def detect_document_text(self, image_bytes: bytes) -> "vision.AnnotateImageResponse":
+        from google.cloud import vision
+        image = vision.Image(content=image_bytes)
+        return self.client.document_text_detection(image=image)
+
+
+class TesseractProvider(OCRProvider):
+    """Local Tesseract OCR via pytesseract, free and offline but less accurate."""
+
+    name = "tesseract"
+
+    def __init__(self, lang: str = "eng"):
+        self.lang = lang
+
+    def detect_document_text(self, image_bytes: bytes) -> "vision.AnnotateImageResponse":
+        try:
+            import pytesseract
+            from PIL import Image
+        except ImportError:
+            raise RuntimeError("The tesseract OCR provider requires the pytesseract package")
+
+        image = Image.open(io.BytesIO(image_bytes))
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+        return tesseract_response(data, image.width, image.height)
+
+
+#build a vision response (page > block > paragraph > word > symbol) from pytesseract's image_to_data
+def tesseract_response(data: Dict[str, list], width: int, height: int) -> "vision.AnnotateImageResponse":
+    from google.cloud import vision
+    BreakType = vision.TextAnnotation.DetectedBreak.BreakType
+
+    lines = {}
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if not text or float(data["conf"][i]) < 0:
+            continue
+        line_key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(line_key, []).append(i)
+
+    blocks = {}
+    text_lines = []
+    confidences = []
+    for (block_num, par_num, _), indexes in lines.items():
+        paragraphs = blocks.setdefault(block_num, {})
+        words = paragraphs.setdefault(par_num, [])
+        text_lines.append(" ".join(data["text"][i].strip() for i in indexes))
+
+        for position, i in enumerate(indexes):
+            text = data["text"][i].strip()
+            left, top = data["left"][i], data["top"][i]
+            right, bottom = left + data["width"][i], top + data["height"][i]
+            confidence = float(data["conf"][i]) / 100
+            confidences.append(confidence)
+
+            symbols = [vision.Symbol(text=char) for char in text]
+            last_break = BreakType.LINE_BREAK if position == len(indexes) - 1 else BreakType.SPACE
+            symbols[-1].property = vision.TextAnnotation.TextProperty(
+                detected_break=vision.TextAnnotation.DetectedBreak(type_=last_break)
+            )
+            words.append(vision.Word(
+                symbols=symbols,
+                confidence=confidence,
+                bounding_box=vision.BoundingPoly(vertices=[
+                    vision.Vertex(x=left, y=top), vision.Vertex(x=right, y=top),
+                    vision.Vertex(x=right, y=bottom), vision.Vertex(x=left, y=bottom),
+                ]),
+            ))
+
+    page = vision.Page(
+        width=width,
+        height=height,
+        confidence=sum(confidences) / len(confidences) if confidences else 0.0,
+        blocks=[
+            vision.Block(paragraphs=[vision.Paragraph(words=words) for words in paragraphs.values()])
+            for paragraphs in blocks.values()
+        ],
+    )
+    text = "".join(line + "\n" for line in text_lines)
+    return vision.AnnotateImageResponse(full_text_annotation=vision.TextAnnotation(text=text, pages=[page]))
+
+
+class ReplayProvider(OCRProvider):
+    """Serve responses recorded as JSON files named by the image's sha256.
+
+    With a `record_from` provider, misses are forwarded to it and the
+    response is saved, so a run against a real engine builds the fixtures
+    that later runs replay offline.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory: str, record_from: Optional[OCRProvider] = None):
+        self.directory = directory
+        self.record_from = record_from
+
+    def path_for(self, image_bytes: bytes) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(image_bytes).hexdigest()}.json")
+
+    def detect_document_text(self, image_bytes: bytes) -> "vision.AnnotateImageResponse":
+        from google.cloud import vision
+        path = self.path_for(image_bytes)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return vision.AnnotateImageResponse.from_json(f.read())
+        except FileNotFoundError:
+            if self.record_from is None:
+                raise FileNotFoundError(f"No recorded OCR response for image {os.path.basename(path)}")
+
+        response = self.record_from.detect_document_text(image_bytes)
+        if not response.error.message:
+            self.save(path, response)
+        return response
+
+    def save(self, path: str, response: "vision.AnnotateImageResponse") -> None:
+        from google.cloud import vision
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(vision.AnnotateImageResponse.to_json(response))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class OCRProviderRegistry:
+    """Resolve the provider for a config, honouring a process-wide override."""
+
+    NAMES = ("google_vision", "tesseract", "replay", "record")
+
+    def __init__(self, replay_dir: str = "./data/ocr_responses"):
+        self._lock = threading.Lock()
+        self._providers: Dict[str, OCRProvider] = {}
+        self.override: Optional[str] = None
+        self.replay_dir = replay_dir
+
+    def configure(self, provider: Optional[str] = None, replay_dir: Optional[str] = None) -> None:
+        """Force one provider for every config and/or move the replay directory."""
+        if provider and provider not in self.NAMES:
+            raise ValueError(f"Unknown OCR provider '{provider}'")
+        with self._lock:
+            self.override = provider or None
+            if replay_dir and replay_dir != self.replay_dir:
+                self.replay_dir = replay_dir
+                self._providers.pop("replay", None)
+                self._providers.pop("record", None)
+
+    def name_for(self, config: OCRConfig = DEFAULT_CONFIG) -> str:
+        return self.override or config.OCR_PROVIDER
+
+    def get(self, config: OCRConfig = DEFAULT_CONFIG) -> OCRProvider:
+        name = self.name_for(config)
+        if name == "tesseract":
+            # one instance per language
+            name = f"tesseract:{config.TESSERACT_LANG}"
+        with self._lock:
+            provider = self._providers.get(name)
+            if provider is None:
+                provider = self._create(name, config)
+                self._providers[name] = provider
+        return provider
+
+    # caller must hold the lock
+    def _create(self, name: str, config: OCRConfig) -> OCRProvider:
+        if name == "google_vision":
+            return GoogleVisionProvider()
+        if name.startswith("tesseract:"):
+            return TesseractProvider(config.TESSERACT_LANG)
+        if name == "replay":
+            return ReplayProvider(self.replay_dir)
+        if name == "record":
+            vision_provider = self._providers.get("google_vision") or GoogleVisionProvider()
+            self._providers["google_vision"] = vision_provider
+            return ReplayProvider(self.replay_dir, record_from=vision_provider)
+        raise ValueError(f"Unknown OCR provider '{name}'")
+
+
+ocr_providers = OCRProviderRegistry()
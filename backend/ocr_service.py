@@ -1,15 +1,146 @@
-from google.cloud import vision
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Dict, Iterator, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
+import logging
 import re
+import time
 from ocr_config import DEFAULT_CONFIG, OCRConfig
-from image_preprocessing import preprocess_image
+from instrumentation import observe_preprocessing, observe_provider_call, stage
+from preprocess_pool import preprocess_pool
+from ocr_cache import ocr_cache
+from ocr_providers import OCRProvider, ocr_providers
+
+# ocr_layout pulls in numpy, so it is imported where responses are analysed
+if TYPE_CHECKING:
+    from ocr_layout import LayoutTable
+
+logger = logging.getLogger(__name__)
+
+# shared pool for Vision calls; each request bounds its own in-flight variants
+VISION_POOL_SIZE = 16
+vision_executor = ThreadPoolExecutor(max_workers=VISION_POOL_SIZE, thread_name_prefix="vision")
+
+# separate pool for whole pages, since a page task waits on vision_executor tasks
+PAGE_POOL_SIZE = 8
+page_executor = ThreadPoolExecutor(max_workers=PAGE_POOL_SIZE, thread_name_prefix="ocr-page")
+
+# line kinds returned by LineClassifier.classify
+BULLET = "bullet"
+KEY_VALUE = "key_value"
+TABLE = "table"
+PARAGRAPH = "paragraph"
+OTHER = "other"
+
+
+class LineClassifier:
+    """Classify a line in one pass, with every rule of a config compiled up front."""
+
+    def __init__(self, config: OCRConfig = DEFAULT_CONFIG):
+        self.config = config
+        self.debug = config.DEBUG_MODE
+
+        # one alternation for all bullet patterns; the named group says which one matched
+        self.bullet_regex = re.compile(
+            "|".join(f"(?P<bullet_{i}>{pattern})" for i, pattern in enumerate(config.BULLET_PATTERNS)),
+            re.IGNORECASE
+        ) if config.BULLET_PATTERNS else None
+
+        self.key_prefixes = tuple(prefix.lower() for prefix in config.KEY_PREFIXES)
+        self.table_delimiters = tuple(config.TABLE_DELIMITERS)
+        self.min_table_columns = config.MIN_TABLE_COLUMNS
+        self.table_numeric_threshold = config.TABLE_NUMERIC_THRESHOLD
+        self.max_key_words = config.MAX_KEY_WORDS
+        self.min_value_words = config.MIN_VALUE_WORDS
+        self.min_paragraph_words = config.MIN_PARAGRAPH_WORDS
+        self.min_paragraph_chars = config.MIN_PARAGRAPH_CHARS
+
+    def is_bullet(self, text: str) -> bool:
+        if self.bullet_regex is None:
+            return False
+        match = self.bullet_regex.match(text)
+        if match and self.debug:
+            logger.debug("Bullet point detected: %r", text)
+        return match is not None
+
+    def key_value(self, text: str) -> Optional[Tuple[str, str]]:
+        key, separator, value = text.partition(":")
+        if not separator:
+            return None
+
+        key_stripped = key.strip()
+        value_stripped = value.strip()
+        key_words = len(key_stripped.split())
+
+        # key must be short and the value must have something in it
+        if key_words > self.max_key_words:
+            return None
+        if len(value_stripped.split()) < self.min_value_words:
+            return None
+
+        if key_words <= 3 or key_stripped.lower().startswith(self.key_prefixes):
+            if self.debug:
+                logger.debug("Key-value pair detected: %s : %s", key_stripped, value_stripped)
+            return key_stripped, value_stripped
+        return None
+
+    def is_table_row(self, words: List[str]) -> bool:
+        word_count = len(words)
+        if word_count < self.min_table_columns:
+            return False
+
+        # cheapest checks first: cells are concise and mostly numeric
+        if sum(map(len, words)) / word_count > 10:
+            return False
+
+        num_numeric = sum(1 for word in words if any(map(str.isdigit, word)))
+        if num_numeric / word_count < self.table_numeric_threshold:
+            return False
+
+        # need at least 2 (word, delimiter) hits; stop counting once we have them
+        delimiter_count = 0
+        for word in words:
+            for delimiter in self.table_delimiters:
+                if delimiter in word:
+                    delimiter_count += 1
+                    if delimiter_count >= 2:
+                        if self.debug:
+                            logger.debug("Table row detected: %r", " ".join(words))
+                        return True
+        return False
+
+    def is_paragraph(self, text: str, words: Optional[List[str]] = None) -> bool:
+        if words is None:
+            words = text.split()
+        return len(words) >= self.min_paragraph_words and len(text) >= self.min_paragraph_chars
+
+    #classify a line as bullet, key_value, table, paragraph or other, in that order of precedence
+    def classify(self, line: str) -> Tuple[str, Any]:
+        if self.is_bullet(line):
+            return BULLET, None
+
+        pair = self.key_value(line)
+        if pair is not None and pair[0] and pair[1]:
+            return KEY_VALUE, pair
+
+        words = line.split()
+        if self.is_table_row(words):
+            return TABLE, words
+
+        if self.is_paragraph(line, words):
+            return PARAGRAPH, None
+        return OTHER, None
+
+
+#one classifier per config class, built on first use
+@lru_cache(maxsize=None)
+def get_line_classifier(config: OCRConfig = DEFAULT_CONFIG) -> LineClassifier:
+    return LineClassifier(config)
 
-print("OCR SERVICE LOADED")
-client = vision.ImageAnnotatorClient()
 
 class DocumentStructureAnalyzer:
     def __init__(self, config: OCRConfig = DEFAULT_CONFIG):
         self.config = config # initialize with a configuration
+        self.classifier = get_line_classifier(config)
 
 
     
@@ -39,96 +170,30 @@ class DocumentStructureAnalyzer:
         result = (is_large and is_centered) or is_very_large
         
         if result and self.config.DEBUG_MODE:
-            print(f"Section header detected: '{text}' (font: {font_size}, avg: {avg_font_size}, centered: {is_centered})")
+            logger.debug("Section header detected: %r (font: %s, avg: %s, centered: %s)",
+                         text, font_size, avg_font_size, is_centered)
         
         return result
     
 
     #Determine if a line is a bullet point
     def is_bullet_point(self, text: str) -> bool:
-        for pattern in self.config.BULLET_PATTERNS:
-            if re.match(pattern, text, re.IGNORECASE):
-                if self.config.DEBUG_MODE:
-                    print(f"Bullet point detected: '{text}'")
-                return True
-        return False
+        return self.classifier.is_bullet(text)
     
     #determine table rows
     def is_table_row(self, words: List[str]) -> bool:
-        
-        
-        # must have minimum columns
-        if len(words) < self.config.MIN_TABLE_COLUMNS:
-            return False
-        
-        # check for numbers (more common in tables)
-        num_numeric = sum(1 for word in words if any(char.isdigit() for char in word))
-        numeric_ratio = num_numeric / len(words)
-        
-        # check for delimiters (tabs, pipes) that often indicate table structure
-        delimiter_count = sum(
-            1 for word in words 
-            for delimiter in self.config.TABLE_DELIMITERS 
-            if delimiter in word
-        )
-        has_delimiters = delimiter_count >= 2  # need at least 2 delimiter instances
-        
-        # check if words are reasonably short (cells are usually concise)
-        avg_word_length = sum(len(w) for w in words) / len(words)
-        if avg_word_length > 10:  # too long for word length
-            return False
-        
-        # must have BOTH high numeric content AND delimiters
-        is_table = (numeric_ratio >= self.config.TABLE_NUMERIC_THRESHOLD) and has_delimiters
-        
-        if is_table and self.config.DEBUG_MODE:
-            print(f"Table row detected: '{' '.join(words)}'")
-        
-        return is_table
-
-
-
+        return self.classifier.is_table_row(words)
 
     #check if text is key value pair
     def is_key_value_pair(self, text: str) -> tuple[bool, Optional[str], Optional[str]]:
-
-        if ":" not in text:
-            return False, None, None
-        
-        parts = text.split(":", 1)
-        if len(parts) != 2:
-            return False, None, None
-        
-        key, value = parts  
-        key_stripped = key.strip()
-        value_stripped = value.strip()
-
-        # key must be short
-        if len(key_stripped.split()) > self.config.MAX_KEY_WORDS:
-            return (False, None, None)
-        
-        # value must have something in it
-        if len(value_stripped.split()) < self.config.MIN_VALUE_WORDS:
+        pair = self.classifier.key_value(text)
+        if pair is None:
             return (False, None, None)
-        
-        # check if key starts with common prefixes
-        key_lower = key_stripped.lower()
-        is_common_key = any(
-            key_lower.startswith(prefix) 
-            for prefix in self.config.KEY_PREFIXES
-        )
-
-        if is_common_key or len(key_stripped.split()) <= 3:
-            if self.config.DEBUG_MODE:
-                print(f"Key-value pair detected: {key_stripped} : {value_stripped}")
-            return (True, key_stripped, value_stripped)
-        
-        return (False, None, None)
+        return (True, pair[0], pair[1])
     
     #check if text is a paragraph by length
     def is_paragraph(self, text: str) -> bool:
-        words = text.split()
-        return (len(words) >= self.config.MIN_PARAGRAPH_WORDS and len(text) >= self.config.MIN_PARAGRAPH_CHARS)
+        return self.classifier.is_paragraph(text)
     
 
 
@@ -138,69 +203,246 @@ class DocumentStructureAnalyzer:
 
 
 
-#extract structured text from image bytes using google vision, using configurable header and section detection
+#send a single image to the configured ocr provider
+def detect_document_text(image_bytes: bytes, provider: Optional[OCRProvider] = None):
+    provider = provider or ocr_providers.get()
+    started = time.perf_counter()
+    outcome = "exception"
+    try:
+        with stage("vision", provider=provider.name, bytes=len(image_bytes)):
+            response = provider.detect_document_text(image_bytes)
+        outcome = "error" if response.error.message else "ok"
+        return response
+    finally:
+        observe_provider_call(provider.name, time.perf_counter() - started, outcome)
+
+
+def response_text_length(response) -> int:
+    return len(response.full_text_annotation.text) if response.full_text_annotation.text else 0
+
+
+#average page confidence, falling back to block confidence when pages have none
+def response_confidence(response) -> float:
+    pages = response.full_text_annotation.pages
+    confidences = [page.confidence for page in pages if page.confidence]
+    if not confidences:
+        confidences = [block.confidence for page in pages for block in page.blocks if block.confidence]
+    return sum(confidences) / len(confidences) if confidences else 0.0
+
+
+#check if a variant is good enough to stop waiting for the others
+def passes_early_exit(response, config: OCRConfig) -> bool:
+    min_length = config.EARLY_EXIT_MIN_TEXT_LENGTH
+    min_confidence = config.EARLY_EXIT_MIN_CONFIDENCE
+
+    if min_length is None and min_confidence is None:
+        return False
+    if min_length is not None and response_text_length(response) < min_length:
+        return False
+    if min_confidence is not None and response_confidence(response) < min_confidence:
+        return False
+    return True
+
+
+#run vision on the preprocessed variants concurrently and keep the best response
+def detect_best_variant(variants: List[bytes], config: OCRConfig = DEFAULT_CONFIG,
+                        provider: Optional[OCRProvider] = None):
+    provider = provider or ocr_providers.get(config)
+    max_in_flight = max(1, config.PREPROCESSING_MAX_CONCURRENCY)
+    remaining = iter(variants)
+    pending = set()
+    best = None
+    last_error = None
+    last_error_response = None
+
+    # keep at most max_in_flight variants submitted, so an early exit never sends the rest
+    def fill():
+        while len(pending) < max_in_flight:
+            img_bytes = next(remaining, None)
+            if img_bytes is None:
+                return
+            pending.add(vision_executor.submit(detect_document_text, img_bytes, provider))
+
+    fill()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                response = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+
+            if response.error.message:
+                last_error_response = response
+                continue
+
+            if passes_early_exit(response, config):
+                for other in pending:
+                    other.cancel()
+                return response
+            # only the longest response so far stays referenced; losing variants are freed as they arrive
+            if best is None or response_text_length(response) > response_text_length(best):
+                best = response
+        fill()
+
+    if best is not None:
+        return best
+    if last_error_response is not None:
+        return last_error_response
+    if last_error is not None:
+        raise last_error
+    raise Exception("Image preprocessing produced no variants")
+
+
+#ocr the pages of a document in parallel, yielding (page_number, result) in page order
+def iter_document_results(data: bytes, config: OCRConfig = DEFAULT_CONFIG) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    from image_preprocessing import iter_document_pages
+
+    max_in_flight = max(1, config.MAX_PARALLEL_PAGES)
+    pages = iter_document_pages(data, config.PDF_RENDER_DPI)
+    in_flight = {}
+    next_page = 1
+    submitted = 0
+
+    try:
+        # pages are decoded lazily, so at most max_in_flight page images exist at once
+        while True:
+            while len(in_flight) < max_in_flight:
+                page_bytes = next(pages, None)
+                if page_bytes is None:
+                    break
+                submitted += 1
+                in_flight[submitted] = page_executor.submit(extract_structured_text, page_bytes, config)
+                del page_bytes
+
+            if next_page not in in_flight:
+                return
+
+            result = in_flight.pop(next_page).result()
+            yield next_page, result
+            next_page += 1
+    finally:
+        for future in in_flight.values():
+            future.cancel()
+
+
+#merge per-page results into one structured document (single images keep the plain format)
+def extract_document(data: bytes, config: OCRConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
+    document = None
+    pages = []
+
+    for page_number, result in iter_document_results(data, config):
+        if document is None:
+            document = {
+                "headers": [],
+                "sections": [],
+                "key_values": {},
+                "bullet_points": [],
+                "tables": [],
+                "paragraphs": [],
+            }
+        for field in ("headers", "sections", "bullet_points", "tables", "paragraphs"):
+            document[field].extend(result.get(field, []))
+        document["key_values"].update(result.get("key_values", {}))
+        pages.append({"page": page_number, **result})
+
+    if document is None:
+        raise Exception("Document has no pages")
+    if len(pages) == 1:
+        page = pages[0]
+        del page["page"]
+        return page
+
+    document["pages"] = pages
+    document["metadata"] = {
+        "page_count": len(pages),
+        "total_lines": sum(page["metadata"]["total_lines"] for page in pages),
+        "config_used": pages[0]["metadata"]["config_used"],
+    }
+    document["raw_text"] = "\f".join(page.get("raw_text", "") for page in pages)
+    return document
+
+
+#extract structured text, serving repeat uploads of the same bytes from the result cache
 def extract_structured_text(image_bytes: bytes, config: OCRConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
+    if not config.USE_RESULT_CACHE:
+        return _extract_structured_text(image_bytes, config)
+
+    key = ocr_cache.make_key(image_bytes, config, ocr_providers.name_for(config))
+    cached = ocr_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = _extract_structured_text(image_bytes, config)
+    ocr_cache.put(key, result)
+    return result
+
+
+#extract structured text from image bytes with the configured ocr provider, using configurable header and section detection
+def _extract_structured_text(image_bytes: bytes, config: OCRConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
     
+    provider = ocr_providers.get(config)
+    preprocessing = {}
     if config.USE_IMAGE_PREPROCESSING:
-        print("Image preprocessing ENABLED")
-        preprocessed_images = preprocess_image(image_bytes)
-        
-        all_results = []
-        for img_bytes in preprocessed_images:
-            image = vision.Image(content=img_bytes)
-            response = client.document_text_detection(image=image)
-            if not response.error.message:
-                all_results.append(response)
-        
-        response = max(all_results, key=lambda r: len(r.full_text_annotation.text) if r.full_text_annotation.text else 0)
+        with stage("preprocess", bytes=len(image_bytes)):
+            preprocessed_images = preprocess_pool.run(image_bytes, config, preprocessing)
+        observe_preprocessing(preprocessing.get("timings", {}))
+        response = detect_best_variant(preprocessed_images, config, provider)
     else:
-        print("Image preprocessing DISABLED - using original image")
-        image = vision.Image(content=image_bytes)
-        response = client.document_text_detection(image=image)
+        response = detect_document_text(image_bytes, provider)
     
     if response.error.message:
-        raise Exception(f"Google Vision API error: {response.error.message}")
+        raise Exception(f"OCR provider error ({provider.name}): {response.error.message}")
     
-    full_text = response.full_text_annotation.text
+    # numpy is imported here rather than at startup
+    from ocr_layout import LayoutTable
+
+    with stage("layout"):
+        layout = LayoutTable.from_response(response)
+        # everything below reads the compact table, so the protobuf tree can go now
+        del response
+        document_structure = analyze_layout(layout, config)
+
+    if preprocessing:
+        document_structure["metadata"]["preprocessing"] = {
+            "variants": preprocessing["variants"],
+            "quality": preprocessing["quality"],
+            "timings_ms": {name: round(seconds * 1000, 2) for name, seconds in preprocessing["timings"].items()},
+        }
+    return document_structure
+
+
+#turn an ocr response into headers, sections, key-values, bullets, tables and paragraphs
+def analyze_response(response, config: OCRConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
+    from ocr_layout import LayoutTable
+
+    return analyze_layout(LayoutTable.from_response(response), config)
+
+
+#the analysis itself, on the compact model built from a response
+def analyze_layout(layout: "LayoutTable", config: OCRConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
+    full_text = layout.text
 
     for artifact in config.OCR_ARTIFACTS: 
         full_text = full_text.replace(artifact, " ")
     
     lines = [line.strip(config.STRIP_CHARS) for line in full_text.split('\n') if line.strip()]
 
-    # init analyzer with configurations
+    # init analyzer with configurations (the line classifier is compiled once per config)
     analyzer = DocumentStructureAnalyzer(config)
+    classifier = analyzer.classifier
+
+    # real geometry per line from the word/line table
+    avg_font_size = layout.avg_font_size()
+    page_height = next((float(h) for h in layout.page_heights[::-1] if h), None)
 
-    # get font and spatial information
-    font_sizes = []
-    line_positions = {}
-    page_height = None
-
-    if response.full_text_annotation.pages:
-        for page in response.full_text_annotation.pages:
-            if page.height:
-                page_height = page.height
-
-            #get paragraph text
-            for block in page.blocks:
-                for paragraph in block.paragraphs:
-                    para_text = ""
-                    for word in paragraph.words:
-                        word_text = ''.join([symbol.text for symbol in word.symbols])
-                        para_text += word_text + " "
-                    para_text = para_text.strip()
-
-                    #store position
-                    if paragraph.bounding_box.vertices:
-                        y_pos = paragraph.bounding_box.vertices[0].y
-                        line_positions[para_text] = y_pos
-
-                    for word in paragraph.words:
-                        vertices = word.bounding_box.vertices
-                        if len(vertices) >= 3:
-                            height = vertices[2].y - vertices[0].y
-                            font_sizes.append(height)
-    avg_font_size = sum(font_sizes) / len(font_sizes) if font_sizes else None
+    line_index = layout.match_lines(lines)
+    # without font sizes the mask is all False
+    header_lines = layout.header_mask(
+        avg_font_size if config.USE_FONT_SIZE_DETECTION else None,
+        config.USE_SPATIAL_DETECTION
+    )
 
     document_structure = {
         "headers": [],
@@ -216,23 +458,38 @@ def extract_structured_text(image_bytes: bytes, config: OCRConfig = DEFAULT_CONF
     table_buffer = []
 
     for i, line in enumerate(lines):
-        position_y = line_positions.get(line)
+        layout_line = line_index[i]
+        if layout_line >= 0 and header_lines[layout_line]:
+            if config.DEBUG_MODE:
+                logger.debug("Section header detected: %r (avg font: %s)", line, avg_font_size)
 
-        font_size = None 
-        if line in line_positions and font_sizes:
-            font_size = avg_font_size
+            if table_buffer:
+                document_structure["tables"].append(table_buffer)
+                if config.SECTION_GROUPING_ENABLED:
+                    current_section_content.append({"type": "table", "rows": table_buffer})
+                table_buffer = []
 
+            document_structure["headers"].append(line)
+            if config.SECTION_GROUPING_ENABLED:
+                if current_section:
+                    document_structure["sections"].append({
+                        "title": current_section,
+                        "content": current_section_content
+                    })
+                current_section = line
+                current_section_content = []
+            continue
 
-        
+        kind, payload = classifier.classify(line)
 
-        if analyzer.is_bullet_point(line):
+        if kind == BULLET:
             document_structure["bullet_points"].append(line)
             if config.SECTION_GROUPING_ENABLED:
                 current_section_content.append({"type": "bullet", "text": line})
             continue
 
-        is_kv, key, value = analyzer.is_key_value_pair(line)
-        if is_kv and key and value:
+        if kind == KEY_VALUE:
+            key, value = payload
             document_structure["key_values"][key] = value
             if config.SECTION_GROUPING_ENABLED:
                 current_section_content.append({
@@ -242,9 +499,8 @@ def extract_structured_text(image_bytes: bytes, config: OCRConfig = DEFAULT_CONF
                 })
             continue
 
-        words = line.split()
-        if analyzer.is_table_row(words):
-            table_buffer.append(words)
+        if kind == TABLE:
+            table_buffer.append(payload)
             continue
         else:
             if table_buffer:
@@ -256,7 +512,7 @@ def extract_structured_text(image_bytes: bytes, config: OCRConfig = DEFAULT_CONF
                     })
                 table_buffer = []
         
-        if analyzer.is_paragraph(line):
+        if kind == PARAGRAPH:
             document_structure["paragraphs"].append(line)
             if config.SECTION_GROUPING_ENABLED:
                 current_section_content.append({
@@ -0,0 +1,132 @@
+#process pool for cpu-bound image preprocessing, with image bytes passed through shared memory
+import multiprocessing
+import pickle
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+
+from ocr_config import DEFAULT_CONFIG, OCRConfig
+
+
+# runs in a worker process: read the image from shared memory, write the variants back into a new block
+def _preprocess_shared(name: str, size: int, config: OCRConfig) -> Tuple[str, List[int], Dict[str, Any]]:
+    from image_preprocessing import preprocess_image
+
+    source = SharedMemory(name=name)
+    view = source.buf[:size]
+    try:
+        report = {}
+        variants = preprocess_image(view, config, report)
+    finally:
+        view.release()
+        source.close()
+
+    lengths = [len(variant) for variant in variants]
+    output = SharedMemory(create=True, size=max(sum(lengths), 1))
+    offset = 0
+    for variant in variants:
+        output.buf[offset:offset + len(variant)] = variant
+        offset += len(variant)
+    output.close()
+    # the parent unlinks the block once it has copied the variants out
+    return output.name, lengths, report
+
+
+# configs are classes, so only ones importable by module path can be sent to a worker
+@lru_cache(maxsize=None)
+def _is_picklable(config: OCRConfig) -> bool:
+    if config.__module__ == "__main__":
+        return False
+    try:
+        pickle.dumps(config)
+        return True
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+
+
+class PreprocessPool:
+    """Run preprocess_image in worker processes, blocking callers when the pool is saturated."""
+
+    def __init__(self, max_workers: int = 0, max_pending: int = 0):
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self.max_workers = 0
+        self.max_pending = 0
+        self.configure(max_workers, max_pending)
+
+    def configure(self, max_workers: int, max_pending: int = 0) -> None:
+        """Set the pool size (0 runs preprocessing in the calling thread).
+
+        max_pending bounds the images queued or in flight; 0 means twice the
+        number of workers. The processes themselves start on first use.
+        """
+        self.shutdown()
+        with self._lock:
+            self.max_workers = max(max_workers, 0)
+            self.max_pending = max_pending if max_pending > 0 else self.max_workers * 2
+            self._slots = threading.BoundedSemaphore(self.max_pending) if self.max_workers else None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # never fork the (multi-threaded) api process itself
+                if sys.platform.startswith("linux"):
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload(["image_preprocessing"])
+                else:
+                    context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def run(self, image_bytes: bytes, config: OCRConfig = DEFAULT_CONFIG,
+            report: Optional[Dict[str, Any]] = None) -> List[bytes]:
+        """Preprocess an image in the pool, same contract as preprocess_image."""
+        if not self.max_workers or not image_bytes or not _is_picklable(config):
+            # opencv is only loaded in this process when preprocessing runs inline
+            from image_preprocessing import preprocess_image
+            return preprocess_image(image_bytes, config, report)
+
+        # backpressure: wait for a free slot instead of queueing without bound
+        with self._slots:
+            source = SharedMemory(create=True, size=len(image_bytes))
+            try:
+                source.buf[:len(image_bytes)] = image_bytes
+                future = self._get_executor().submit(_preprocess_shared, source.name, len(image_bytes), config)
+                try:
+                    name, lengths, worker_report = future.result()
+                except BrokenProcessPool:
+                    # a crashed worker poisons the executor; start a fresh one next time
+                    self.shutdown(wait=False)
+                    raise
+            finally:
+                source.close()
+                source.unlink()
+
+        output = SharedMemory(name=name)
+        try:
+            variants = []
+            offset = 0
+            for length in lengths:
+                variants.append(bytes(output.buf[offset:offset + length]))
+                offset += length
+        finally:
+            output.close()
+            output.unlink()
+
+        if report is not None:
+            report.update(worker_report)
+        return variants
+
+
+preprocess_pool = PreprocessPool()
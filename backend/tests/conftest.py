@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Settings are read once at import time, so point them at a throwaway
+# SQLite database before any app module is imported
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("LOG_LEVEL", "INFO")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client(caplog):
+    # the bug this guards against only shows once INFO records are actually built
+    caplog.set_level(logging.INFO, logger="main")
+    return TestClient(main.app)
+
+
+def test_ocr_logs_the_upload(client, caplog, monkeypatch):
+    monkeypatch.setattr(main, "extract_document", lambda contents: {"raw_text": "hello"})
+
+    response = client.post("/ocr", files={"file": ("page.png", b"image bytes", "image/png")})
+
+    assert response.status_code == 200
+    assert response.json() == {"raw_text": "hello"}
+    record = next(r for r in caplog.records if r.getMessage() == "OCR request")
+    assert record.upload_filename == "page.png"
+    assert record.bytes == len(b"image bytes")
+
+
+def test_ocr_logs_the_failure(client, caplog, monkeypatch):
+    def fail(contents):
+        raise ValueError("Could not decode image")
+
+    monkeypatch.setattr(main, "extract_document", fail)
+
+    response = client.post("/ocr", files={"file": ("page.png", b"image bytes", "image/png")})
+
+    assert response.status_code == 200
+    assert response.json() == {"error": "Could not decode image"}
+    record = next(r for r in caplog.records if r.getMessage() == "OCR request failed")
+    assert record.upload_filename == "page.png"
+    assert record.exc_info is not None
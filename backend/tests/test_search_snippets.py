@@ -0,0 +1,19 @@
+from app.search.base import MATCH_END, MATCH_START, highlight_snippet, render_snippet
+
+
+def test_highlight_snippet_escapes_note_text():
+    snippet = highlight_snippet("photosynthesis <script>alert(1)</script> & more", ["photosynthesis"])
+    assert snippet == "<mark>photosynthesis</mark> &lt;script&gt;alert(1)&lt;/script&gt; &amp; more"
+
+
+def test_highlight_snippet_escapes_without_terms():
+    assert highlight_snippet("<b>bold</b>", []) == "&lt;b&gt;bold&lt;/b&gt;"
+
+
+def test_highlight_snippet_ignores_marker_characters_in_text():
+    assert highlight_snippet(f"{MATCH_START}x{MATCH_END} leaf", ["leaf"]) == "x <mark>leaf</mark>"
+
+
+def test_render_snippet_marks_database_snippets():
+    assert render_snippet(f"a < b {MATCH_START}leaf{MATCH_END}") == "a &lt; b <mark>leaf</mark>"
+    assert render_snippet(None) == ""
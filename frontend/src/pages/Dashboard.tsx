@@ -1,6 +1,11 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { notesAPI } from '../services/api';
-import { Note, NoteWithImage } from '../types';
+import { Note, NoteStatus, NoteDetail } from '../types';
+
+// OCR runs in the background after upload; poll until it settles
+const POLL_INTERVAL_MS = 1000;
+
+const isProcessing = (status: string) => status === 'pending' || status === 'processing';
 
 interface DashboardProps {
   userEmail: string;
@@ -9,20 +14,58 @@ interface DashboardProps {
 
 export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
   const [notes, setNotes] = useState<Note[]>([]);
-  const [selectedNote, setSelectedNote] = useState<NoteWithImage | null>(null);
+  const [selectedNote, setSelectedNote] = useState<NoteDetail | null>(null);
+  const [imageUrl, setImageUrl] = useState<string | null>(null);
+  const [thumbnails, setThumbnails] = useState<Record<number, string>>({});
   const [editedText, setEditedText] = useState('');
   const [message, setMessage] = useState('');
   const [uploading, setUploading] = useState(false);
   const [loading, setLoading] = useState(true);
+  const selectedNoteId = useRef<number | null>(null);
+  const polling = useRef(new Set<number>());
+  const mounted = useRef(true);
+  const thumbnailUrls = useRef(new Map<number, string>());
 
   useEffect(() => {
+    mounted.current = true;
     loadNotes();
+    return () => {
+      mounted.current = false;
+      thumbnailUrls.current.forEach(url => URL.revokeObjectURL(url));
+    };
   }, []);
 
+  // load the thumbnail of every listed note that has one, once
+  useEffect(() => {
+    notes
+      .filter(n => n.thumbnail_url && !thumbnailUrls.current.has(n.id))
+      .forEach(async n => {
+        thumbnailUrls.current.set(n.id, '');
+        try {
+          const url = URL.createObjectURL(await notesAPI.getThumbnail(n.thumbnail_url!));
+          if (!mounted.current || !thumbnailUrls.current.has(n.id)) {
+            URL.revokeObjectURL(url);
+            return;
+          }
+          thumbnailUrls.current.set(n.id, url);
+          setThumbnails(current => ({ ...current, [n.id]: url }));
+        } catch (err) {
+          console.error('Failed to load thumbnail:', err);
+        }
+      });
+  }, [notes]);
+
+  // release the previous image whenever another one replaces it (and on unmount)
+  useEffect(() => () => {
+    if (imageUrl) URL.revokeObjectURL(imageUrl);
+  }, [imageUrl]);
+
   const loadNotes = async () => {
     try {
       const data = await notesAPI.getAll();
       setNotes(data);
+      // pick up notes that were still processing when the page was left
+      data.filter(n => isProcessing(n.status)).forEach(n => watchNote(n.id));
     } catch (err) {
       console.error('Failed to load notes:', err);
     } finally {
@@ -30,6 +73,48 @@ export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
     }
   };
 
+  const setNoteStatus = (noteId: number, status: string) => {
+    setNotes(current => current.map(n => (n.id === noteId ? { ...n, status } : n)));
+  };
+
+  // Poll a note's status until OCR completes or fails
+  const pollStatus = async (noteId: number): Promise<NoteStatus | null> => {
+    while (mounted.current) {
+      const noteStatus = await notesAPI.getStatus(noteId);
+      setNoteStatus(noteId, noteStatus.status);
+      if (!isProcessing(noteStatus.status)) {
+        return noteStatus;
+      }
+      await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+    }
+    return null;
+  };
+
+  const watchNote = async (noteId: number) => {
+    if (polling.current.has(noteId)) return;
+    polling.current.add(noteId);
+
+    try {
+      const noteStatus = await pollStatus(noteId);
+      if (!noteStatus) return;
+
+      if (noteStatus.status === 'failed') {
+        setMessage('Error: ' + (noteStatus.error_message || 'Could not read this note'));
+      } else {
+        setMessage('🐵 Note peeled successfully!');
+      }
+      // previews are made during OCR, so the list only gets a thumbnail now;
+      // the open note is refreshed so its text (or failure) shows up
+      const detail = await notesAPI.getById(noteId);
+      setNotes(current => current.map(n => (n.id === noteId ? { ...n, thumbnail_url: detail.thumbnail_url } : n)));
+      showNoteDetail(detail);
+    } catch (err) {
+      setMessage('Error checking note status: ' + (err instanceof Error ? err.message : 'Failed'));
+    } finally {
+      polling.current.delete(noteId);
+    }
+  };
+
   const handleFileSelect = async (e: React.ChangeEvent<HTMLInputElement>) => {
     const file = e.target.files?.[0];
     if (!file) return;
@@ -37,24 +122,48 @@ export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
     setUploading(true);
     setMessage('🍌 Peeling your notes...');
 
+    let newNote: Note;
     try {
-      const newNote = await notesAPI.upload(file);
-      setNotes([newNote, ...notes]);
-      await viewNote(newNote);
-      setMessage('🐵 Note peeled successfully!');
+      newNote = await notesAPI.upload(file);
     } catch (err) {
       setMessage('Error: ' + (err instanceof Error ? err.message : 'Upload failed'));
+      return;
     } finally {
       setUploading(false);
       e.target.value = '';
     }
+
+    setNotes(current => [newNote, ...current]);
+    await viewNote(newNote);
+    watchNote(newNote.id);
+  };
+
+  const showNoteDetail = (detail: NoteDetail) => {
+    if (selectedNoteId.current !== detail.id) return;
+    setSelectedNote(detail);
+    setEditedText(detail.structured_text || detail.raw_text || '');
+  };
+
+  const loadNoteDetail = async (noteId: number) => {
+    showNoteDetail(await notesAPI.getById(noteId));
+  };
+
+  // Stream the original image into an object URL instead of a base64 payload
+  const loadNoteImage = async (noteId: number) => {
+    try {
+      const image = await notesAPI.getImage(noteId);
+      if (selectedNoteId.current !== noteId) return;
+      setImageUrl(URL.createObjectURL(image));
+    } catch (err) {
+      console.error('Failed to load image:', err);
+    }
   };
 
   const viewNote = async (note: Note) => {
+    selectedNoteId.current = note.id;
+    setImageUrl(null);
     try {
-      const fullNote = await notesAPI.getById(note.id);
-      setSelectedNote(fullNote);
-      setEditedText(fullNote.structured_text || fullNote.raw_text || '');
+      await Promise.all([loadNoteDetail(note.id), loadNoteImage(note.id)]);
     } catch (err) {
       setMessage('Error loading note: ' + (err instanceof Error ? err.message : 'Failed'));
     }
@@ -79,8 +188,13 @@ export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
     try {
       await notesAPI.delete(noteId);
       setNotes(notes.filter(n => n.id !== noteId));
+      const thumbnail = thumbnailUrls.current.get(noteId);
+      if (thumbnail) URL.revokeObjectURL(thumbnail);
+      thumbnailUrls.current.delete(noteId);
       if (selectedNote?.id === noteId) {
+        selectedNoteId.current = null;
         setSelectedNote(null);
+        setImageUrl(null);
         setEditedText('');
       }
       setMessage('Note deleted');
@@ -178,7 +292,21 @@ export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
                 }}
               >
                 <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
-                  <div>
+                  {thumbnails[note.id] && (
+                    <img
+                      src={thumbnails[note.id]}
+                      alt=""
+                      style={{
+                        width: '48px',
+                        height: '48px',
+                        objectFit: 'cover',
+                        borderRadius: '6px',
+                        border: '1px solid #FFE082',
+                        marginRight: '10px'
+                      }}
+                    />
+                  )}
+                  <div style={{ flex: 1 }}>
                     <strong style={{ fontSize: '14px', color: '#5D4037' }}>
                       {note.title || 'Untitled'}
                     </strong>
@@ -186,6 +314,12 @@ export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
                     <small style={{ color: '#8D6E63' }}>
                       {new Date(note.created_at).toLocaleDateString()}
                     </small>
+                    {isProcessing(note.status) && (
+                      <small style={{ color: '#FF9800', fontWeight: 'bold' }}> · 🍌 Peeling...</small>
+                    )}
+                    {note.status === 'failed' && (
+                      <small style={{ color: '#c62828', fontWeight: 'bold' }}> · Failed</small>
+                    )}
                   </div>
                   <button
                     onClick={(e) => { e.stopPropagation(); deleteNote(note.id); }}
@@ -243,6 +377,7 @@ export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
               </h2>
               <button
                 onClick={saveNote}
+                disabled={selectedNote.status !== 'completed'}
                 style={{
                   padding: '12px 25px',
                   background: 'linear-gradient(135deg, #FFC107 0%, #FF9800 100%)',
@@ -267,9 +402,9 @@ export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
                 border: '1px solid #FFE082'
               }}>
                 <h3 style={{ marginTop: 0, color: '#5D4037' }}>📷 Original Image</h3>
-                {selectedNote.image_base64 && (
+                {imageUrl && (
                   <img
-                    src={`data:${selectedNote.image_mimetype};base64,${selectedNote.image_base64}`}
+                    src={imageUrl}
                     alt="Note"
                     style={{
                       maxWidth: '100%',
@@ -288,23 +423,33 @@ export default function Dashboard({ userEmail, onLogout }: DashboardProps) {
                 border: '1px solid #FFE082'
               }}>
                 <h3 style={{ marginTop: 0, color: '#5D4037' }}>🍌 Peeled Text (Editable)</h3>
-                <textarea
-                  value={editedText}
-                  onChange={(e) => setEditedText(e.target.value)}
-                  style={{
-                    width: '100%',
-                    minHeight: '400px',
-                    padding: '15px',
-                    border: '2px solid #FFE082',
-                    borderRadius: '8px',
-                    fontSize: '14px',
-                    lineHeight: '1.6',
-                    resize: 'vertical',
-                    fontFamily: 'Georgia, serif',
-                    boxSizing: 'border-box',
-                    outline: 'none'
-                  }}
-                />
+                {isProcessing(selectedNote.status) ? (
+                  <p style={{ color: '#FF9800', fontWeight: 'bold' }}>
+                    🍌 Peeling your note... the text will appear here when it is ready.
+                  </p>
+                ) : selectedNote.status === 'failed' ? (
+                  <p style={{ color: '#c62828' }}>
+                    We couldn't read this note: {selectedNote.error_message || 'processing failed'}.
+                  </p>
+                ) : (
+                  <textarea
+                    value={editedText}
+                    onChange={(e) => setEditedText(e.target.value)}
+                    style={{
+                      width: '100%',
+                      minHeight: '400px',
+                      padding: '15px',
+                      border: '2px solid #FFE082',
+                      borderRadius: '8px',
+                      fontSize: '14px',
+                      lineHeight: '1.6',
+                      resize: 'vertical',
+                      fontFamily: 'Georgia, serif',
+                      boxSizing: 'border-box',
+                      outline: 'none'
+                    }}
+                  />
+                )}
               </div>
             </div>
           </div>
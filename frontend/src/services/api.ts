@@ -1,4 +1,4 @@
-import { UserCreate, UserLogin, AuthToken, User, Note, NoteWithImage, OCRResult } from '../types';
+import { UserCreate, UserLogin, AuthToken, User, Note, NoteStatus, NoteDetail, OCRResult } from '../types';
 
 const API_URL = 'http://127.0.0.1:8000';
 
@@ -33,6 +33,20 @@ async function fetchWithAuth<T>(url: string, options: RequestInit = {}): Promise
   return response.json();
 }
 
+// Fetch a binary resource (images need the auth header, so no plain <img src>)
+async function fetchBlobWithAuth(url: string): Promise<Blob> {
+  const token = getToken();
+  const response = await fetch(`${API_URL}${url}`, {
+    headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+  });
+  
+  if (!response.ok) {
+    throw new Error('Failed to load image');
+  }
+  
+  return response.blob();
+}
+
 // Auth API
 export const authAPI = {
   register: (data: UserCreate): Promise<User> => 
@@ -79,9 +93,21 @@ export const notesAPI = {
   getAll: (): Promise<Note[]> =>
     fetchWithAuth('/api/notes/'),
     
-  // Get single note with image
-  getById: (id: number): Promise<NoteWithImage> =>
-    fetchWithAuth(`/api/notes/${id}/full`),
+  // Poll OCR processing status
+  getStatus: (id: number): Promise<NoteStatus> =>
+    fetchWithAuth(`/api/notes/${id}/status`),
+    
+  // Get single note (text and status; the image comes from getImage)
+  getById: (id: number): Promise<NoteDetail> =>
+    fetchWithAuth(`/api/notes/${id}`),
+    
+  // Stream the original image (no base64 round trip)
+  getImage: (id: number): Promise<Blob> =>
+    fetchBlobWithAuth(`/api/notes/${id}/image`),
+    
+  // Load a list thumbnail from the note's thumbnail_url
+  getThumbnail: (thumbnailUrl: string): Promise<Blob> =>
+    fetchBlobWithAuth(thumbnailUrl),
     
   // Update note
   update: (id: number, data: { structured_text?: string; title?: string }): Promise<{ message: string }> =>
@@ -32,13 +32,22 @@ export interface Note {
   created_at: string;
   subject?: string;
   topic?: string;
+  thumbnail_url?: string | null;
 }
 
-export interface NoteWithImage extends Note {
-  image_base64: string;
+export interface NoteStatus {
+  id: number;
+  status: string;
+  error_message?: string | null;
+  processed_at?: string | null;
+}
+
+// The image itself is streamed separately (notesAPI.getImage)
+export interface NoteDetail extends Note {
   image_mimetype: string;
   raw_text: string;
   structured_text: string;
+  error_message?: string | null;
 }
 
 export interface OCRResult {